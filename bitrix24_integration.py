@@ -1,13 +1,118 @@
 import aiohttp
+import asyncio
 import json
 import logging
 import os
+import random
+import time
 from typing import Dict, List, Optional
 from datetime import datetime
+from functools import lru_cache
+from urllib.parse import urlencode
+
+try:
+    import orjson
+except ImportError:  # orjson не установлен - используем стандартный json
+    orjson = None
 
 # Настройка логирования с датой и временем
 from logger_config import bitrix24_logger as logger
 
+# Заголовки для запросов с заранее сериализованным JSON-телом
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
+def _lead_count_command(*statuses: str) -> str:
+    """Команда batch-запроса для подсчета лидов бота с указанными статусами"""
+    query = {'filter[SOURCE_ID]': 'TELEGRAM_BOT', 'select[]': 'ID'}
+    if statuses:
+        query['filter[STATUS_ID][]'] = list(statuses)
+    return f"crm.lead.list?{urlencode(query, doseq=True)}"
+
+# Соответствие статусов лидов Bitrix24 ключам статистики
+STATUS_BUCKETS = {
+    'NEW': 'new',
+    'PROCESSED': 'processed',
+    'IN_PROCESS': 'processed',
+    'CONVERTED': 'converted',
+    'JUNK': 'lost',
+}
+
+def _group_statuses_by_bucket() -> Dict[str, List[str]]:
+    """Группировка статусов STATUS_BUCKETS по ключам статистики"""
+    buckets: Dict[str, List[str]] = {}
+    for status, bucket in STATUS_BUCKETS.items():
+        buckets.setdefault(bucket, []).append(status)
+    return buckets
+
+# Команды batch-запроса статистики лидов (ключ команды = ключ в статистике)
+LEAD_STATISTICS_COMMANDS = {
+    'total': _lead_count_command(),
+    **{
+        bucket: _lead_count_command(*statuses)
+        for bucket, statuses in _group_statuses_by_bucket().items()
+    },
+}
+
+# Краткие формулировки вопросов для комментария к лиду (в порядке QUESTIONS)
+LEAD_QUESTION_TITLES: tuple[str, ...] = (
+    "Общая сумма долгов",
+    "Имущество в залоге",
+    "Зарегистрированное имущество",
+    "Сделки с имуществом за 3 года",
+    "Официальный доход",
+)
+
+# Формат даты в комментарии к лиду
+LEAD_DATE_FORMAT = '%d.%m.%Y %H:%M'
+
+@lru_cache(maxsize=1)
+def _format_minute(minute: int) -> str:
+    """Форматирование даты по номеру минуты (кэшируется в пределах минуты)"""
+    return datetime.fromtimestamp(minute * 60).strftime(LEAD_DATE_FORMAT)
+
+def current_date_stamp() -> str:
+    """Текущая дата в формате LEAD_DATE_FORMAT"""
+    return _format_minute(int(time.time() // 60))
+
+# Время жизни кэша списков лидов и статистики (секунды)
+LEAD_CACHE_TTL = 60
+STATISTICS_CACHE_TTL = 30
+NEW_LEADS_CACHE_TTL = 15
+
+# Таймаут и повторы запросов к Bitrix24
+BITRIX_REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=15, connect=3)
+BITRIX_RETRY_ATTEMPTS = 4
+BITRIX_RETRY_BASE_DELAY = 0.2
+BITRIX_RETRY_MAX_DELAY = 5.0
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Общая HTTP сессия для всех экземпляров интеграции (пул keep-alive соединений)
+_SESSION: Optional[aiohttp.ClientSession] = None
+
+async def get_bitrix_session() -> aiohttp.ClientSession:
+    """Получение общей HTTP сессии Bitrix24 (создается один раз на процесс)"""
+    global _SESSION
+    if _SESSION is None or _SESSION.closed:
+        connector = aiohttp.TCPConnector(
+            limit=32,
+            limit_per_host=16,
+            keepalive_timeout=75,
+            ttl_dns_cache=300,
+            enable_cleanup_closed=True,
+        )
+        _SESSION = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=30),
+        )
+    return _SESSION
+
+async def close_bitrix_session():
+    """Закрытие общей HTTP сессии Bitrix24 (при завершении работы)"""
+    global _SESSION
+    if _SESSION is not None:
+        await _SESSION.close()
+        _SESSION = None
+
 class Bitrix24Integration:
     def __init__(self, webhook_url: str):
         """
@@ -17,13 +122,76 @@ class Bitrix24Integration:
             webhook_url: URL webhook'а Bitrix24 (например: https://your-domain.bitrix24.ru/rest/1/webhook_key/)
         """
         self.webhook_url = webhook_url.rstrip('/')
-        self.session = None
+        
+        # URL методов REST API
+        self._url_lead_add = f"{self.webhook_url}/crm.lead.add.json"
+        self._url_lead_list = f"{self.webhook_url}/crm.lead.list.json"
+        self._url_lead_update = f"{self.webhook_url}/crm.lead.update.json"
+        self._url_batch = f"{self.webhook_url}/batch.json"
+        
+        # Кэш списков лидов и статистики: ключ -> (время истечения, значение)
+        self._cache: Dict[str, tuple] = {}
+        self._cache_locks: Dict[str, asyncio.Lock] = {}
+    
+    @staticmethod
+    def _dumps(data) -> bytes:
+        """
+        Сериализация тела запроса в JSON (orjson, если доступен)
+        
+        Нестроковые ключи словарей (например, числовые ID) сериализуются
+        напрямую, без предварительного приведения к str.
+        """
+        if orjson is not None:
+            return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(data, ensure_ascii=False).encode('utf-8')
+    
+    @staticmethod
+    def _loads(raw: bytes):
+        """Разбор JSON-ответа (orjson, если доступен)"""
+        if orjson is not None:
+            return orjson.loads(raw)
+        return json.loads(raw)
     
     async def _get_session(self):
-        """Получение HTTP сессии"""
-        if self.session is None:
-            self.session = aiohttp.ClientSession()
-        return self.session
+        """Получение HTTP сессии (общей для всех экземпляров)"""
+        return await get_bitrix_session()
+    
+    async def _request(self, method: str, url: str, idempotent: bool = True, **kwargs):
+        """
+        HTTP-запрос к Bitrix24 с таймаутом и повторами с экспоненциальной задержкой
+        
+        Повторяются сетевые ошибки, таймауты и ответы 429/5xx. Прочие HTTP ошибки
+        (4xx) возвращаются сразу. Для неидемпотентных запросов повторяется только
+        ошибка установки соединения, чтобы не создать дубликат.
+        
+        Args:
+            method: HTTP метод
+            url: URL метода REST API
+            idempotent: Можно ли безопасно повторять запрос
+            **kwargs: Параметры aiohttp запроса
+        
+        Returns:
+            tuple: (HTTP статус, разобранный JSON-ответ или None)
+        """
+        session = await self._get_session()
+        retryable_errors = (aiohttp.ClientError, asyncio.TimeoutError) if idempotent else aiohttp.ClientConnectorError
+        
+        for attempt in range(1, BITRIX_RETRY_ATTEMPTS + 1):
+            try:
+                async with session.request(method, url, timeout=BITRIX_REQUEST_TIMEOUT, **kwargs) as response:
+                    if response.status == 200:
+                        return response.status, self._loads(await response.read())
+                    if not idempotent or response.status not in RETRYABLE_STATUSES or attempt == BITRIX_RETRY_ATTEMPTS:
+                        return response.status, None
+                    logger.warning(f"⚠️ HTTP {response.status} от Bitrix24, попытка {attempt} из {BITRIX_RETRY_ATTEMPTS}")
+            except retryable_errors as e:
+                if attempt == BITRIX_RETRY_ATTEMPTS:
+                    raise
+                logger.warning(f"⚠️ Ошибка запроса к Bitrix24: {e!r}, попытка {attempt} из {BITRIX_RETRY_ATTEMPTS}")
+            
+            # Экспоненциальная задержка со случайной добавкой
+            delay = BITRIX_RETRY_BASE_DELAY * 2 ** (attempt - 1) + random.uniform(0, BITRIX_RETRY_BASE_DELAY)
+            await asyncio.sleep(min(delay, BITRIX_RETRY_MAX_DELAY))
     
     async def create_lead(self, user_data: Dict) -> Optional[Dict]:
         """
@@ -46,15 +214,17 @@ class Bitrix24Integration:
             Dict с результатом создания лида или None при ошибке
         """
         try:
-            session = await self._get_session()
+            first_name = user_data.get("first_name", "")
+            last_name = user_data.get("last_name", "")
+            phone_number = user_data.get("phone_number", "")
             
             # Формируем данные для лида
             lead_data = {
                 'fields': {
-                    'TITLE': f'Заявка {user_data.get("first_name", "")} {user_data.get("last_name", "")} от @ivan_spisanie_dolga',
-                    'NAME': user_data.get("first_name", ""),
-                    'LAST_NAME': user_data.get("last_name", ""),
-                    'PHONE': [{'VALUE': user_data.get("phone_number", ""), 'VALUE_TYPE': 'WORK'}],
+                    'TITLE': f'Заявка {first_name} {last_name} от @ivan_spisanie_dolga',
+                    'NAME': first_name,
+                    'LAST_NAME': last_name,
+                    'PHONE': [{'VALUE': phone_number, 'VALUE_TYPE': 'WORK'}],
                     'COMMENTS': self._format_lead_comments(user_data),
                     'SOURCE_ID': '46',
                     'STATUS_ID': 'NEW',
@@ -65,61 +235,97 @@ class Bitrix24Integration:
             }
             
             # Создаем лид
-            url = f"{self.webhook_url}/crm.lead.add.json"
-            async with session.post(url, json=lead_data) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    if result.get('result'):
-                        logger.info(f"✅ Лид создан в Bitrix24: {result['result']}")
-                        return result
-                    else:
-                        logger.error(f"❌ Ошибка создания лида: {result}")
-                        return None
+            url = self._url_lead_add
+            status, result = await self._request('POST', url, data=self._dumps(lead_data), headers=JSON_HEADERS, idempotent=False)
+            if status == 200:
+                if result.get('result'):
+                    logger.info(f"✅ Лид создан в Bitrix24: {result['result']}")
+                    self.invalidate_lead_cache()
+                    return result
                 else:
-                    logger.error(f"❌ HTTP ошибка при создании лида: {response.status}")
+                    logger.error(f"❌ Ошибка создания лида: {result}")
                     return None
-                    
+            else:
+                logger.error(f"❌ HTTP ошибка при создании лида: {status}")
+                return None
+                
         except Exception as e:
             logger.error(f"❌ Ошибка при создании лида: {e}")
             return None
     
     def _format_lead_comments(self, user_data: Dict) -> str:
         """Форматирование комментария к лиду"""
-        comments = []
-        
         # Основная информация
-        comments.append(f"ID пользователя: {user_data.get('user_id')}")
-        if user_data.get('username'):
-            comments.append(f"Username: @{user_data.get('username')}")
+        comments = [f"ID пользователя: {user_data.get('user_id')}"]
+        username = user_data.get('username')
+        if username:
+            comments.append(f"Username: @{username}")
         
         # Ответы на вопросы
         answers = user_data.get('answers', {})
         if answers:
             comments.append("\n📋 Ответы на вопросы:")
-            questions = [
-                "Общая сумма долгов",
-                "Имущество в залоге", 
-                "Зарегистрированное имущество",
-                "Сделки с имуществом за 3 года",
-                "Официальный доход"
-            ]
-            
-            for i, (question, answer) in enumerate(zip(questions, answers.values())):
-                comments.append(f"{i+1}. {question}: {answer}")
+            comments.extend(
+                f"{i}. {question}: {answer}"
+                for i, (question, answer) in enumerate(zip(LEAD_QUESTION_TITLES, answers.values()), 1)
+            )
         
         # Контактная информация
-        if user_data.get('phone_number'):
-            comments.append(f"\n📞 Телефон: {user_data.get('phone_number')}")
-        if user_data.get('consultation_time'):
-            comments.append(f"🕐 Время консультации: {user_data.get('consultation_time')}")
+        phone_number = user_data.get('phone_number')
+        if phone_number:
+            comments.append(f"\n📞 Телефон: {phone_number}")
+        consultation_time = user_data.get('consultation_time')
+        if consultation_time:
+            comments.append(f"🕐 Время консультации: {consultation_time}")
         
-        comments.append(f"\n📅 Дата создания: {datetime.now().strftime('%d.%m.%Y %H:%M')}")
+        comments.append(f"\n📅 Дата создания: {current_date_stamp()}")
         
         return "\n".join(comments)
     
+    async def _cached(self, key: str, fetch, ttl: float = LEAD_CACHE_TTL):
+        """
+        Возвращает значение из кэша или загружает его (с кэшированием на ttl секунд)
+        
+        Args:
+            key: Ключ кэша
+            fetch: Корутинная функция загрузки значения
+            ttl: Время жизни значения в кэше (секунды)
+        """
+        entry = self._cache.get(key)
+        if entry and time.monotonic() < entry[0]:
+            return entry[1]
+        
+        # Одновременные запросы при пустом кэше ждут один общий запрос к Bitrix24
+        lock = self._cache_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            entry = self._cache.get(key)
+            if entry and time.monotonic() < entry[0]:
+                return entry[1]
+            
+            value = await fetch()
+            if value:
+                self._cache[key] = (time.monotonic() + ttl, value)
+            return value
+    
+    def invalidate_lead_cache(self):
+        """Сброс кэша списков лидов и статистики"""
+        self._cache.clear()
+    
     async def get_leads(self, limit: int = 50) -> List[Dict]:
         """
-        Получение списка лидов
+        Получение списка лидов (с кэшированием)
+        
+        Args:
+            limit: Количество лидов для получения
+        
+        Returns:
+            Список лидов
+        """
+        return await self._cached(f'leads:{limit}', lambda: self._fetch_leads(limit))
+    
+    async def _fetch_leads(self, limit: int) -> List[Dict]:
+        """
+        Загрузка списка лидов из Bitrix24
         
         Args:
             limit: Количество лидов для получения
@@ -128,9 +334,7 @@ class Bitrix24Integration:
             Список лидов
         """
         try:
-            session = await self._get_session()
-            
-            url = f"{self.webhook_url}/crm.lead.list.json"
+            url = self._url_lead_list
             params = {
                 'select': ['ID', 'TITLE', 'NAME', 'LAST_NAME', 'PHONE', 'COMMENTS', 'DATE_CREATE', 'STATUS_ID'],
                 'filter': {'SOURCE_ID': 'TELEGRAM_BOT'},
@@ -138,33 +342,39 @@ class Bitrix24Integration:
                 'start': 0
             }
             
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    if result.get('result'):
-                        return result['result']
-                    else:
-                        logger.error(f"❌ Ошибка получения лидов: {result}")
-                        return []
+            status, result = await self._request('GET', url, params=params)
+            if status == 200:
+                if result.get('result'):
+                    return result['result']
                 else:
-                    logger.error(f"❌ HTTP ошибка при получении лидов: {response.status}")
+                    logger.error(f"❌ Ошибка получения лидов: {result}")
                     return []
-                    
+            else:
+                logger.error(f"❌ HTTP ошибка при получении лидов: {status}")
+                return []
+                
         except Exception as e:
             logger.error(f"❌ Ошибка при получении лидов: {e}")
             return []
     
     async def get_new_leads(self) -> List[Dict]:
         """
-        Получение новых лидов
+        Получение новых лидов (с кэшированием)
+        
+        Returns:
+            Список новых лидов
+        """
+        return await self._cached('new_leads', self._fetch_new_leads, NEW_LEADS_CACHE_TTL)
+    
+    async def _fetch_new_leads(self) -> List[Dict]:
+        """
+        Загрузка новых лидов из Bitrix24
         
         Returns:
             Список новых лидов
         """
         try:
-            session = await self._get_session()
-            
-            url = f"{self.webhook_url}/crm.lead.list.json"
+            url = self._url_lead_list
             params = {
                 'select': ['ID', 'TITLE', 'NAME', 'LAST_NAME', 'PHONE', 'COMMENTS', 'DATE_CREATE'],
                 'filter': {
@@ -175,18 +385,17 @@ class Bitrix24Integration:
                 'start': 0
             }
             
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    if result.get('result'):
-                        return result['result']
-                    else:
-                        logger.error(f"❌ Ошибка получения новых лидов: {result}")
-                        return []
+            status, result = await self._request('GET', url, params=params)
+            if status == 200:
+                if result.get('result'):
+                    return result['result']
                 else:
-                    logger.error(f"❌ HTTP ошибка при получении новых лидов: {response.status}")
+                    logger.error(f"❌ Ошибка получения новых лидов: {result}")
                     return []
-                    
+            else:
+                logger.error(f"❌ HTTP ошибка при получении новых лидов: {status}")
+                return []
+                
         except Exception as e:
             logger.error(f"❌ Ошибка при получении новых лидов: {e}")
             return []
@@ -203,9 +412,7 @@ class Bitrix24Integration:
             True при успехе, False при ошибке
         """
         try:
-            session = await self._get_session()
-            
-            url = f"{self.webhook_url}/crm.lead.update.json"
+            url = self._url_lead_update
             data = {
                 'id': lead_id,
                 'fields': {
@@ -213,81 +420,83 @@ class Bitrix24Integration:
                 }
             }
             
-            async with session.post(url, json=data) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    if result.get('result'):
-                        logger.info(f"✅ Статус лида {lead_id} обновлен на {status_id}")
-                        return True
-                    else:
-                        logger.error(f"❌ Ошибка обновления статуса лида: {result}")
-                        return False
+            status, result = await self._request('POST', url, data=self._dumps(data), headers=JSON_HEADERS)
+            if status == 200:
+                if result.get('result'):
+                    logger.info(f"✅ Статус лида {lead_id} обновлен на {status_id}")
+                    self.invalidate_lead_cache()
+                    return True
                 else:
-                    logger.error(f"❌ HTTP ошибка при обновлении статуса лида: {response.status}")
+                    logger.error(f"❌ Ошибка обновления статуса лида: {result}")
                     return False
-                    
+            else:
+                logger.error(f"❌ HTTP ошибка при обновлении статуса лида: {status}")
+                return False
+                
         except Exception as e:
             logger.error(f"❌ Ошибка при обновлении статуса лида: {e}")
             return False
     
     async def get_lead_statistics(self) -> Dict:
         """
-        Получение статистики по лидам
+        Получение статистики по лидам (с кэшированием)
+        
+        Returns:
+            Словарь со статистикой
+        """
+        return await self._cached('statistics', self._fetch_lead_statistics, STATISTICS_CACHE_TTL)
+    
+    async def _fetch_lead_statistics(self) -> Dict:
+        """
+        Загрузка статистики по лидам из Bitrix24
         
         Returns:
             Словарь со статистикой
         """
         try:
-            session = await self._get_session()
-            
-            # Получаем все лиды от бота
-            url = f"{self.webhook_url}/crm.lead.list.json"
-            params = {
-                'select': ['STATUS_ID', 'DATE_CREATE'],
-                'filter': {'SOURCE_ID': 'TELEGRAM_BOT'},
-                'start': 0
+            # Подсчитываем лиды по статусам на стороне Bitrix24 одним batch-запросом:
+            # вместо выгрузки всех лидов получаем только общее количество по каждому фильтру
+            url = self._url_batch
+            data = {
+                'halt': 0,
+                'cmd': LEAD_STATISTICS_COMMANDS
             }
             
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    if result.get('result'):
-                        leads = result['result']
-                        
-                        # Подсчитываем статистику
-                        stats = {
-                            'total': len(leads),
-                            'new': 0,
-                            'processed': 0,
-                            'converted': 0,
-                            'lost': 0
-                        }
-                        
-                        for lead in leads:
-                            status = lead.get('STATUS_ID', 'NEW')
-                            if status == 'NEW':
-                                stats['new'] += 1
-                            elif status in ['PROCESSED', 'IN_PROCESS']:
-                                stats['processed'] += 1
-                            elif status == 'CONVERTED':
-                                stats['converted'] += 1
-                            elif status == 'JUNK':
-                                stats['lost'] += 1
-                        
-                        return stats
-                    else:
-                        logger.error(f"❌ Ошибка получения статистики: {result}")
-                        return {}
+            status, result = await self._request('POST', url, data=self._dumps(data), headers=JSON_HEADERS)
+            if status == 200:
+                batch = result.get('result') or {}
+                totals = batch.get('result_total')
+                if isinstance(totals, dict) and not batch.get('result_error'):
+                    return {key: int(totals.get(key, 0)) for key in LEAD_STATISTICS_COMMANDS}
                 else:
-                    logger.error(f"❌ HTTP ошибка при получении статистики: {response.status}")
+                    logger.error(f"❌ Ошибка получения статистики: {result}")
                     return {}
-                    
+            else:
+                logger.error(f"❌ HTTP ошибка при получении статистики: {status}")
+                return {}
+                
         except Exception as e:
             logger.error(f"❌ Ошибка при получении статистики: {e}")
             return {}
     
+    async def get_dashboard(self) -> Dict:
+        """
+        Параллельное получение лидов, новых лидов и статистики
+        
+        Returns:
+            Словарь с ключами 'leads', 'new_leads' и 'statistics'
+        """
+        leads, new_leads, stats = await asyncio.gather(
+            self.get_leads(),
+            self.get_new_leads(),
+            self.get_lead_statistics()
+        )
+        return {
+            'leads': leads,
+            'new_leads': new_leads,
+            'statistics': stats
+        }
+    
     async def close(self):
-        """Закрытие HTTP сессии"""
-        if self.session:
-            await self.session.close()
-            self.session = None
+        """Закрытие HTTP сессии (вызывается при завершении работы бота)"""
+        await close_bitrix_session()
@@ -4,10 +4,32 @@
 """
 
 import os
+import pwd
 import sys
-import subprocess
+from importlib.util import find_spec
 from pathlib import Path
 
+def apply_permissions(root, mode, uid=None, gid=None):
+    """
+    Рекурсивно устанавливает права доступа (и владельца, если указан)
+    без запуска внешних процессов chmod/chown
+    
+    Returns:
+        bool: True если владелец установлен для всех файлов и директорий
+    """
+    owner_applied = uid is not None
+    for dirpath, _, filenames in os.walk(root):
+        for path in (dirpath, *(os.path.join(dirpath, name) for name in filenames)):
+            if os.path.islink(path):
+                continue
+            os.chmod(path, mode)
+            if owner_applied:
+                try:
+                    os.chown(path, uid, gid)
+                except PermissionError:
+                    owner_applied = False
+    return owner_applied
+
 def init_docker():
     """Инициализация Docker контейнера"""
     print("🔧 Инициализация Docker контейнера...")
@@ -26,27 +48,29 @@ def init_docker():
     
     # Устанавливаем правильные права доступа
     try:
-        # Устанавливаем права на директории
-        subprocess.run(['chmod', '-R', '755', '/app'], check=True)
-        
-        # Устанавливаем владельца на botuser (если пользователь существует)
+        # Определяем владельца botuser (если пользователь существует)
         try:
-            subprocess.run(['chown', '-R', 'botuser:botuser', '/app'], check=True)
+            uid, gid = pwd.getpwnam('botuser')[2:4]
+        except KeyError:
+            uid = gid = None
+        
+        # Устанавливаем права и владельца на директории за один обход
+        if apply_permissions('/app', 0o755, uid, gid):
             print("✅ Права доступа установлены для botuser")
-        except subprocess.CalledProcessError:
+        else:
             # Если botuser не существует, устанавливаем права для всех
-            subprocess.run(['chmod', '-R', '777', '/app/logs'], check=True)
-            subprocess.run(['chmod', '-R', '777', '/app/data'], check=True)
+            apply_permissions('/app/logs', 0o777)
+            apply_permissions('/app/data', 0o777)
             print("✅ Права доступа установлены для всех пользователей")
             
-    except subprocess.CalledProcessError as e:
+    except OSError as e:
         print(f"⚠️ Не удалось установить права доступа: {e}")
         # Пытаемся установить права только на критичные директории
         try:
-            subprocess.run(['chmod', '777', '/app/logs'], check=True)
-            subprocess.run(['chmod', '777', '/app/data'], check=True)
+            os.chmod('/app/logs', 0o777)
+            os.chmod('/app/data', 0o777)
             print("✅ Критичные права доступа установлены")
-        except subprocess.CalledProcessError:
+        except OSError:
             print("❌ Не удалось установить права доступа")
     
     # Проверяем наличие необходимых файлов
@@ -56,10 +80,10 @@ def init_docker():
         'requirements.txt'
     ]
     
-    missing_files = []
-    for file in required_files:
-        if not os.path.exists(file):
-            missing_files.append(file)
+    # Читаем содержимое рабочей директории одним вызовом
+    with os.scandir('.') as entries:
+        present_files = {entry.name for entry in entries}
+    missing_files = [file for file in required_files if file not in present_files]
     
     if missing_files:
         print(f"❌ Отсутствуют файлы: {', '.join(missing_files)}")
@@ -67,14 +91,12 @@ def init_docker():
     
     print("✅ Все необходимые файлы найдены")
     
-    # Проверяем Python зависимости
-    try:
-        import telethon
-        import dotenv
-        print("✅ Python зависимости установлены")
-    except ImportError as e:
-        print(f"❌ Отсутствует зависимость: {e}")
+    # Проверяем Python зависимости (без выполнения самих модулей)
+    missing_modules = [module for module in ('telethon', 'dotenv') if find_spec(module) is None]
+    if missing_modules:
+        print(f"❌ Отсутствует зависимость: {', '.join(missing_modules)}")
         return False
+    print("✅ Python зависимости установлены")
     
     print("🎉 Инициализация Docker контейнера завершена успешно!")
     return True
@@ -1,7 +1,51 @@
+import atexit
 import logging
 import os
+import queue
 import datetime
-from logging.handlers import RotatingFileHandler
+from logging.handlers import MemoryHandler, QueueHandler, QueueListener, RotatingFileHandler
+
+# Форматтер с датой и временем (применяется в фоновом потоке QueueListener)
+_formatter = logging.Formatter(
+    '%(asctime)s [%(levelname)s] %(name)s: %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+# Общая очередь записей: логгеры только кладут записи в очередь,
+# а запись в консоль и файлы выполняет один фоновый поток
+_log_queue = queue.Queue(-1)
+
+_console_handler = logging.StreamHandler()
+_console_handler.setFormatter(_formatter)
+
+_listener = QueueListener(_log_queue, _console_handler, respect_handler_level=True)
+_listener.start()
+
+# Буферизованные обработчики файлов (сбрасываются на диск при завершении)
+_buffered_handlers = []
+
+def _shutdown():
+    """Дописывает оставшиеся записи из очереди и буферов при завершении процесса"""
+    _listener.stop()
+    for handler in _buffered_handlers:
+        handler.flush()
+
+atexit.register(_shutdown)
+
+class _DeferredQueueHandler(QueueHandler):
+    """QueueHandler, который не форматирует записи в вызывающем потоке"""
+    
+    def prepare(self, record):
+        # Подстановку аргументов, asctime и трассировку исключений выполняют
+        # обработчики QueueListener в фоновом потоке, а не цикл событий
+        return record
+
+# Имена уже настроенных логгеров
+_CONFIGURED: set[str] = set()
+
+def _add_listener_handler(handler: logging.Handler):
+    """Подключает обработчик к фоновому потоку логирования"""
+    _listener.handlers = _listener.handlers + (handler,)
 
 def setup_logger(name: str, log_file: str = None, level: int = logging.INFO):
     """
@@ -15,15 +59,9 @@ def setup_logger(name: str, log_file: str = None, level: int = logging.INFO):
     Returns:
         Настроенный логгер
     """
-    # Создаем форматтер с датой и временем
-    formatter = logging.Formatter(
-        '%(asctime)s [%(levelname)s] %(name)s: %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    
-    # Создаем обработчик для консоли
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(formatter)
+    # Повторные вызовы возвращают уже настроенный логгер
+    if name in _CONFIGURED:
+        return logging.getLogger(name)
     
     # Настраиваем логгер
     logger = logging.getLogger(name)
@@ -32,8 +70,8 @@ def setup_logger(name: str, log_file: str = None, level: int = logging.INFO):
     # Очищаем существующие обработчики
     logger.handlers.clear()
     
-    # Добавляем обработчик консоли
-    logger.addHandler(console_handler)
+    # Логгер пишет только в общую очередь (консоль подключена к QueueListener)
+    logger.addHandler(_DeferredQueueHandler(_log_queue))
     
     # Пытаемся создать обработчик для файла
     try:
@@ -52,16 +90,29 @@ def setup_logger(name: str, log_file: str = None, level: int = logging.INFO):
             backupCount=5,
             encoding='utf-8'
         )
-        file_handler.setFormatter(formatter)
+        file_handler.setFormatter(_formatter)
+        
+        # Накапливаем записи в памяти и пишем в файл пачками;
+        # ошибки сбрасывают буфер сразу
+        buffered_handler = MemoryHandler(
+            capacity=512,
+            flushLevel=logging.ERROR,
+            target=file_handler
+        )
+        
+        # В файл попадают только записи этого логгера
+        buffered_handler.addFilter(logging.Filter(name))
         
-        # Добавляем обработчик файла
-        logger.addHandler(file_handler)
+        # Подключаем обработчик файла к фоновому потоку
+        _buffered_handlers.append(buffered_handler)
+        _add_listener_handler(buffered_handler)
         
     except (PermissionError, OSError) as e:
         # Если не удалось создать файл лога, используем только консоль
         print(f"⚠️ Не удалось создать файл лога для {name}: {e}")
         print("📝 Логирование будет происходить только в консоль")
     
+    _CONFIGURED.add(name)
     return logger
 
 def get_logger(name: str):
@@ -76,8 +127,9 @@ def get_logger(name: str):
     """
     return setup_logger(name)
 
-# Создаем стандартные логгеры
-user_bot_logger = setup_logger('user_bot')
-admin_panel_logger = setup_logger('admin_panel')
-bitrix24_logger = setup_logger('bitrix24')
-system_logger = setup_logger('system')
+# Стандартные логгеры (user_bot_logger, admin_panel_logger, bitrix24_logger,
+# system_logger) создаются при первом обращении, а не при импорте модуля
+def __getattr__(name: str):
+    if name.endswith('_logger'):
+        return setup_logger(name[:-len('_logger')])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
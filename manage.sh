@@ -318,7 +318,7 @@ fix_permissions() {
         
         # Проверяем права на конкретные файлы данных
         echo -e "${YELLOW}📄 Проверка прав на файлы данных:${NC}"
-        for data_file in data/users_data.json data/applications_data.json data/applications.json; do
+        for data_file in data/users_data.json data/applications_data.json data/applications.jsonl; do
             if [ -f "$data_file" ]; then
                 echo "   $data_file: $(ls -la "$data_file" | awk '{print $1, $3, $4}')"
             else
@@ -179,4 +179,11 @@ def main():
         print("\n❌ Ошибка настройки авторизации UserBot")
 
 if __name__ == "__main__":
+    # Используем uvloop в качестве цикла событий, если он установлен
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+    
     main()
@@ -0,0 +1,50 @@
+"""
+Тесты извлечения номера телефона из текста сообщения
+"""
+
+import unittest
+
+from user_bot import SilentUserBot
+
+
+class PhoneParser:
+    """Минимальный объект с методами разбора номера (без подключения к Telegram)"""
+    validate_phone_number = SilentUserBot.validate_phone_number
+    extract_phone_from_text = SilentUserBot.extract_phone_from_text
+
+
+class ExtractPhoneFromTextTest(unittest.TestCase):
+    def extract(self, text):
+        is_valid, phone, _ = PhoneParser().extract_phone_from_text(text)
+        return is_valid, phone
+
+    def test_formats(self):
+        cases = {
+            "89123456789": "+79123456789",
+            "+79123456789": "+79123456789",
+            "9123456789": "+79123456789",
+            "звоните 8-912-345-67-89": "+79123456789",
+            "тел: 912 345 67 89": "+79123456789",
+            "+7 (912) 345-67-89": "+79123456789",
+            "8 (916) 123-45-67": "+79161234567",
+            "+7 8916 123 4567": "+79161234567",
+            "7 8916 123 4567": "+79161234567",
+            "+79123456789 и 89990001122": "+79123456789",
+        }
+        for text, phone in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(self.extract(text), (True, phone))
+
+    def test_no_phone(self):
+        for text in (
+            "Бюджет 300 000 - 500 000 руб, 2 комнаты",
+            "1 2 3 4 5 6 7 8 9 0",
+            "8123456789",
+            "",
+        ):
+            with self.subTest(text=text):
+                self.assertEqual(self.extract(text), (False, ""))
+
+
+if __name__ == "__main__":
+    unittest.main()
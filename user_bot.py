@@ -3,10 +3,14 @@ import logging
 import os
 import json
 import signal
-import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
 from datetime import datetime, timedelta
+from functools import lru_cache
+from operator import itemgetter
 from telethon import TelegramClient, events
-from telethon.tl.types import User
+from telethon.tl.types import InputDocument, User
 from typing import Dict, Optional
 import re
 
@@ -14,10 +18,323 @@ from config import API_ID, API_HASH, PHONE_NUMBER, SESSION_NAME, BOT_NAME
 from config import QUESTIONS, FINAL_MESSAGE, GREETING_MESSAGE, GREETING_VIDEO_PATH, PHONE_QUESTION_VIDEO_PATH, BITRIX24_WEBHOOK_URL
 from bitrix24_integration import Bitrix24Integration
 
+try:
+    import orjson
+except ImportError:  # orjson не установлен - используем стандартный json
+    orjson = None
+
 # Настройка логирования с датой и временем
 from logger_config import user_bot_logger as logger
 
+# Символы, удаляемые из номера телефона перед проверкой (все, кроме цифр и '+')
+PHONE_CLEAN_RE = re.compile(r'[^\d+]')
+
+# Нормализация очищенного номера к формату +7XXXXXXXXXX по (длине, первому символу);
+# первый символ учитывается только если это '+', '7' или '8', иначе ключ - ''
+PHONE_NORMALIZERS = {
+    (12, '+'): lambda phone: phone,              # +7XXXXXXXXXX
+    (11, '8'): lambda phone: '+7' + phone[1:],   # 8XXXXXXXXXX
+    (11, '7'): lambda phone: '+' + phone,        # 7XXXXXXXXXX
+    (11, ''): lambda phone: '+7' + phone[1:],    # XXXXXXXXXXX (с кодом страны)
+    (10, '7'): lambda phone: '+7' + phone,       # XXXXXXXXXX (без кода страны)
+    (10, ''): lambda phone: '+7' + phone,        # XXXXXXXXXX (без кода страны)
+}
+
+# Корректный российский номер после нормализации
+NORMALIZED_PHONE_RE = re.compile(r'\+7\d{10}')
+
+# Разделитель между группами цифр номера: пробелы и не более одного дефиса или скобки
+PHONE_SEPARATOR = r'\s*[\-()]?\s*'
+
+# Поиск номера телефона в тексте: необязательный код страны (+7, 8 или 7)
+# и 10 цифр группами 3-3-2-2 или 4-2-2-2 (например, 8 (916) 123-45-67, +7 8916 12 34 56)
+PHONE_FIND_RE = re.compile(
+    rf'(?<!\d)(?:(\+7|8|7){PHONE_SEPARATOR})?'
+    rf'((?:\d{{3}}{PHONE_SEPARATOR}\d{{3}}|\d{{4}}{PHONE_SEPARATOR}\d{{2}}){PHONE_SEPARATOR}\d{{2}}{PHONE_SEPARATOR}\d{{2}})(?!\d)'
+)
+
+# Указание времени консультации: ключевые слова (ищутся как подстроки, без учета регистра)
+# или время в формате ЧЧ:ММ (например, 14:00, 15:30)
+TIME_KEYWORDS_RE = re.compile(
+    r'утром|днем|вечером|ночью|завтра|сегодня|послезавтра|'
+    r'понедельник|вторник|среда|четверг|пятница|суббота|воскресенье',
+    re.IGNORECASE,
+)
+CLOCK_TIME_RE = re.compile(r'\b\d{1,2}:\d{2}\b')
+
+def json_default(obj):
+    """Сериализация типов, которые orjson поддерживает сам, для стандартного json"""
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    return asdict(obj)
+
+def dump_json(data, pretty: bool = False) -> bytes:
+    """
+    Сериализация данных для сохранения на диск (orjson, если доступен)
+    
+    Служебные файлы пишутся компактно; pretty=True - с отступами для чтения человеком.
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_INDENT_2 if pretty else orjson.OPT_NON_STR_KEYS
+        return orjson.dumps(data, option=option)
+    if pretty:
+        return json.dumps(data, ensure_ascii=False, indent=2, default=json_default).encode('utf-8')
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=json_default).encode('utf-8')
+
+def load_json(raw: bytes):
+    """Разбор JSON, прочитанного с диска (orjson, если доступен)"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+def write_json_file(path: str, data):
+    """Записывает данные в JSON-файл для чтения человеком одним вызовом write (создает директорию)"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    payload = dump_json(data, pretty=True)
+    with open(path, 'wb') as f:
+        f.write(payload)
+
+def write_file_atomic(path: str, payload: bytes):
+    """Атомарная запись файла: пишем во временный файл и заменяем им исходный"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+def answers_to_payload(answers: Dict[int, str]) -> Dict[str, str]:
+    """Ответы для сохранения и отправки: номера вопросов -> ключи вида question_N"""
+    return {f"question_{number}": answer for number, answer in answers.items()}
+
+def answers_from_payload(answers: Dict[str, str]) -> Dict[int, str]:
+    """Ответы из сохраненных данных: ключи question_N (или N) -> номера вопросов"""
+    return {int(key.rpartition('_')[2]): answer for key, answer in answers.items()}
+
+def format_display_datetime(dt: datetime) -> str:
+    """Форматирует дату и время для вывода (ДД.ММ.ГГГГ ЧЧ:ММ) без обращения к strftime"""
+    return f"{dt.day:02d}.{dt.month:02d}.{dt.year} {dt.hour:02d}:{dt.minute:02d}"
+
+def format_application_date(date: str) -> str:
+    """Форматирует ISO-дату заявки для вывода"""
+    try:
+        if date != 'N/A':
+            return format_display_datetime(datetime.fromisoformat(date))
+        return 'N/A'
+    except (TypeError, ValueError):
+        return date
+
+@dataclass
+class ApplicationRecord:
+    """Запись о заявке (user_id, телефон, дата подачи в ISO-формате)"""
+    # _formatted_date - не поле dataclass: не сериализуется и заполняется при первом выводе
+    __slots__ = ('user_id', 'phone_number', 'application_date', '_formatted_date')
+    
+    user_id: int
+    phone_number: str
+    application_date: str
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ApplicationRecord':
+        """Создает запись из словаря, загруженного из JSON"""
+        return cls(
+            data.get('user_id', 'N/A'),
+            data.get('phone_number', 'N/A'),
+            data.get('application_date', 'N/A')
+        )
+    
+    @property
+    def formatted_date(self) -> str:
+        """Дата подачи для вывода (разбирается один раз за время жизни записи)"""
+        try:
+            return self._formatted_date
+        except AttributeError:
+            self._formatted_date = format_application_date(self.application_date)
+            return self._formatted_date
+
+def application_sort_key(record: ApplicationRecord) -> str:
+    """Ключ сортировки заявок по дате: заявки без даты ('N/A') считаются самыми старыми"""
+    date = record.application_date
+    return '' if date == 'N/A' else date
+
+# Поля лида для вывода в админ панели
+LEAD_FIELDS = ('ID', 'TITLE', 'NAME', 'LAST_NAME', 'STATUS_ID', 'DATE_CREATE')
+NEW_LEAD_FIELDS = ('ID', 'TITLE', 'NAME', 'LAST_NAME', 'DATE_CREATE')
+
+@lru_cache(maxsize=None)
+def _lead_getter(fields: tuple) -> itemgetter:
+    return itemgetter(*fields)
+
+def get_lead_fields(lead: Dict, fields: tuple) -> tuple:
+    """Извлекает поля лида одним вызовом; отсутствующие поля заменяются на 'N/A'"""
+    try:
+        return _lead_getter(fields)(lead)
+    except KeyError:
+        return tuple(lead.get(field, 'N/A') for field in fields)
+
+@lru_cache(maxsize=1024)
+def format_lead_date(date_create: str) -> str:
+    """Форматирует дату создания лида из Bitrix24 для вывода (результат кэшируется)"""
+    try:
+        if date_create != 'N/A':
+            return format_display_datetime(datetime.fromisoformat(date_create.replace('Z', '+00:00')))
+        return 'N/A'
+    except (ValueError, TypeError, AttributeError):
+        return date_create
+
+# Ключевые слова для активации бота: обязательное слово и одно из слов про консультацию
+ACTIVATION_REQUIRED_KEYWORD = 'хочу'
+ACTIVATION_CONSULTATION_KEYWORDS = ('консультацию', 'консультация')
+ACTIVATION_REQUIRED_RE = re.compile(re.escape(ACTIVATION_REQUIRED_KEYWORD), re.IGNORECASE)
+ACTIVATION_CONSULTATION_RE = re.compile(
+    '|'.join(map(re.escape, ACTIVATION_CONSULTATION_KEYWORDS)), re.IGNORECASE
+)
+
+# Шаблоны ответов админ панели
+LEAD_STATISTICS_TEMPLATE = (
+    "📈 Статистика лидов:\n"
+    + "=" * 30 + "\n\n"
+    "📊 Всего лидов: {total}\n"
+    "🆕 Новых: {new}\n"
+    "⚙️ В обработке: {processed}\n"
+    "✅ Конвертированных: {converted}\n"
+    "❌ Потерянных: {lost}\n"
+)
+CONVERSION_RATE_TEMPLATE = "\n📈 Процент конверсии: {:.1f}%"
+
+EXPORT_DONE_TEMPLATE = (
+    "📤 Экспорт завершен!\n\n"
+    "📁 Файл: {file}\n"
+    "📊 Количество лидов: {count}\n"
+    "📅 Дата экспорта: {date}"
+)
+
+ADMIN_STATUS_HEADER = "📊 Статус админ панели\n" + "=" * 30 + "\n\n"
+ADMIN_STATUS_INACTIVE = "🔴 Админ панель: НЕАКТИВНА\n🔓 Основной бот работает для всех\n"
+ADMIN_STATUS_NO_ADMIN = "🟢 Админ панель: АКТИВНА\n⚠️ Активный администратор не определен\n"
+ADMIN_STATUS_ACTIVE_SELF_TEMPLATE = (
+    "🟢 Админ панель: АКТИВНА\n"
+    "👤 Активный администратор: {admin}\n"
+    "✅ Вы являетесь активным администратором\n"
+    "🔒 Основной бот заблокирован для вас\n"
+)
+ADMIN_STATUS_ACTIVE_OTHER_TEMPLATE = (
+    "🟢 Админ панель: АКТИВНА\n"
+    "👤 Активный администратор: {admin}\n"
+    "❌ Вы не являетесь активным администратором\n"
+    "🔓 Основной бот работает для вас\n"
+)
+ADMIN_STATUS_USER_TEMPLATE = (
+    "\n👤 Ваш ID: {user_id}\n"
+    "📱 Username: @{username}\n"
+    "🔑 Администратор: {is_admin}\n"
+)
+
+# Подстановка для пользователей без username
+UNKNOWN_USERNAME = 'Не указан'
+
+# Количество вопросов опросника (список вопросов не меняется во время работы)
+QUESTIONS_COUNT = len(QUESTIONS)
+
+# Тексты напоминаний: в опроснике и при ожидании номера телефона (по типу напоминания)
+SURVEY_REMINDER_TEXT = (
+    "⏰ Напоминание: вы находитесь в процессе заполнения опросника для получения бесплатной консультации.\n\n"
+    "📝 Пожалуйста, ответьте на следующий вопрос, чтобы мы могли лучше понять вашу ситуацию и подготовить для вас индивидуальное решение.\n\n"
+    "💡 Чем подробнее вы ответите, тем точнее мы сможем подобрать оптимальную стратегию списания ваших долгов."
+)
+REMINDER_TEXTS = {
+    'first': (
+        "🔍 Вижу, вы ещё не оставили свой номер телефона для бесплатной консультации по списанию долгов.\n\n"
+        "Не переживайте, если сейчас не самое удобное время — мы подберём для вас оптимальный вариант!\n\n"
+        "📝 Просто напишите ваш контактный номер, и мы:\n"
+        " • Согласуем удобное время звонка\n"
+        " • Ответим на все вопросы\n"
+        " • Разработаем план действий\n\n"
+        "📞 Готовы связаться с вами в любой день недели, в том числе в выходные.\n"
+        "Оставьте свой номер прямо сейчас 👇\n\n"
+        "P.S. Помните: чем раньше начнём работу над вашей ситуацией, тем быстрее найдём решение!"
+    ),
+    'final': (
+        "😔 К сожалению, мы так и не получили ваш номер телефона…\n"
+        "Понимаем, что решение финансовых вопросов может вызывать тревогу. Но помните: бездействие только усугубляет ситуацию.\n\n"
+        "🔔 Есть альтернативный вариант:\n"
+        "Подписывайтесь на наш канал, где мы ежедневно публикуем:\n"
+        " • Юридические лайфхаки\n"
+        " • Истории успешных списаний долгов\n"
+        " • Пошаговые инструкции по банкротству\n"
+        " • Ответы на частые вопросы\n\n"
+        "👉 Присоединяйтесь к нам прямо сейчас:\n"
+        "@ivan_kiselev_spisanie\n\n"
+        "Возможно, именно там вы найдёте ответы, которые помогут вам принять правильное решение."
+    ),
+}
+
+# Пауза между последовательными сообщениями одному пользователю (секунды).
+# Порядок сообщений обеспечивается последовательной отправкой, пауза лишь визуальная
+MESSAGE_PAUSE = 0.2
+
+# Ограничения Telegram на отправку сообщений
+TELEGRAM_MESSAGE_LIMIT = 4000  # Максимальная длина части сообщения (лимит Telegram - 4096)
+TELEGRAM_SENDS_PER_SECOND = 25  # Не более 30 сообщений в секунду
+
+def split_message(text: str, limit: int = TELEGRAM_MESSAGE_LIMIT) -> list:
+    """Разбивает текст на части не длиннее limit, по возможности по границам строк"""
+    if len(text) <= limit:
+        return [text]
+    
+    chunks = []
+    current = []
+    current_len = 0
+    for line in text.splitlines(keepends=True):
+        # Слишком длинную строку режем принудительно
+        while len(line) > limit:
+            if current:
+                chunks.append("".join(current))
+                current, current_len = [], 0
+            chunks.append(line[:limit])
+            line = line[limit:]
+        
+        if current_len + len(line) > limit:
+            chunks.append("".join(current))
+            current, current_len = [], 0
+        current.append(line)
+        current_len += len(line)
+    
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+# Файл с идентификаторами уже загруженных в Telegram видео
+VIDEO_CACHE_FILE = 'data/video_cache.json'
+
+# Файл-флаг для очистки состояний и интервал его проверки (секунды)
+CLEAR_SIGNAL_FILE = "clear_user_states.flag"
+CLEAR_SIGNAL_FILE_POLL_INTERVAL = 60
+
+# Интервал фонового сохранения измененных данных пользователей (секунды)
+USERS_DATA_FLUSH_INTERVAL = 2
+
+# Журнал заявок (JSON Lines), срок хранения заявок (дни) и интервал фонового удаления старых заявок (секунды)
+APPLICATIONS_LOG_FILE = 'data/applications.jsonl'
+APPLICATIONS_RETENTION_DAYS = 7
+APPLICATIONS_COMPACT_INTERVAL = 24 * 60 * 60
+
+# Потоки для дисковых операций (один поток - записи файлов выполняются строго по очереди)
+IO_WORKERS = 1
+
 class SilentUserBot:
+    # Фиксированный набор атрибутов экземпляра (без __dict__)
+    __slots__ = (
+        'client', 'bitrix',
+        'user_states', 'user_answers', 'reminder_tasks', 'last_message_times',
+        'survey_reminder_sent', 'scheduled_reminders',
+        'user_message_counts', '_over_limit_users', 'activated_users', 'expired_users', 'deactivated_users',
+        'trigger_keywords',
+        'admin_usernames', 'admin_users', 'admin_mode', 'active_admin_user', '_commands', '_admin_mode_commands',
+        'users_data_file', 'applications_data_file', 'applications_data', '_applications_log',
+        '_clear_event', '_dirty', '_save_lock', '_saved_users_payload',
+        '_send_lock', '_next_send_at', '_io_pool',
+        '_greeting_video_ok', '_phone_question_video_ok', '_video_cache',
+    )
+    
     def __init__(self):
         # Используем отдельный файл сессии для user_bot
         self.client = TelegramClient("user_bot_session", API_ID, API_HASH)
@@ -37,14 +354,32 @@ class SilentUserBot:
         # Админ панель
         # Фиксированный список администраторов (username без @)
         # Для изменения списка администраторов отредактируйте этот блок:
-        self.admin_usernames = {
+        # (список неизменяемый и хранится в нижнем регистре для сравнения без учета регистра)
+        self.admin_usernames = frozenset(username.lower() for username in (
             'readlymayson',  # Основной администратор
             'inkiselev',         # Дополнительный администратор
             # Добавьте сюда других администраторов по необходимости 
             # Пример: 'username1', 'username2'
-        }
+        ))
         self.admin_users = set()  # Кэш ID администраторов
         self.admin_mode = False  # Режим админ панели
+        
+        # Таблицы команд администратора: доступные всегда и только в режиме админ панели
+        self._commands = {
+            '/admin': self.activate_admin_mode,
+            '/stop': self.deactivate_admin_mode,
+            '/status': self.show_status,
+            '/clear': self.force_clear_states,
+            '/admins': self.show_admins,
+        }
+        self._admin_mode_commands = {
+            '/help': self.show_help,
+            '/applications': self.show_applications_data,
+            '/leads': self.show_leads,
+            '/new': self.show_new_leads,
+            '/stats': self.show_lead_statistics,
+            '/export': self.export_leads,
+        }
         self.active_admin_user = None  # ID пользователя, который активировал админ панель
         
         # Создаем директорию для заявок если её нет
@@ -52,20 +387,44 @@ class SilentUserBot:
 
         # Напоминания
         self.reminder_tasks = {} # Словарь для хранения активных задач напоминаний
-        self.last_message_times = {} # Словарь для хранения времени последнего сообщения от пользователя
+        self.last_message_times = {} # Время последнего сообщения от пользователя (секунды Unix-времени)
         self.survey_reminder_sent = {} # Словарь для отслеживания отправленных напоминаний в опроснике
         self.scheduled_reminders = {} # Словарь для хранения запланированных напоминаний (для восстановления)
         
         # Система активации бота по ключевым словам
         self.user_message_counts = {}  # Счетчик сообщений для каждого пользователя
+        self._over_limit_users = set()  # Пользователи со счетчиком больше 5 (только они сохраняются в файл)
         self.activated_users = set()  # Пользователи, для которых бот активирован
         self.expired_users = set()  # Пользователи, которые превысили лимит в 5 сообщений
         self.deactivated_users = set()  # Пользователи, которые деактивированы после заполнения заявки
-        self.trigger_keywords = {'хочу', 'консультацию', 'консультация'}  # Ключевые слова для активации
+        self.trigger_keywords = frozenset((ACTIVATION_REQUIRED_KEYWORD,) + ACTIVATION_CONSULTATION_KEYWORDS)  # Ключевые слова для активации
+        
+        # Ограничение частоты отправки ответов админ панели
+        self._send_lock = asyncio.Lock()
+        self._next_send_at = 0.0
+        
+        # Событие запроса очистки состояний (устанавливается по SIGUSR1)
+        self._clear_event = asyncio.Event()
+        
+        # Отдельный пул потоков для работы с файлами (не блокирует цикл событий)
+        self._io_pool = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix='io')
+        
+        # Отложенное сохранение данных пользователей
+        self._dirty = asyncio.Event()  # Установлено, пока есть несохраненные изменения
+        self._save_lock = asyncio.Lock()  # Не допускает одновременной записи файла
+        self._saved_users_payload = None  # Последнее записанное содержимое файла (пропуск записи без изменений)
         
         # Файл для сохранения данных пользователей
         self.users_data_file = 'data/users_data.json'
         self.applications_data_file = 'data/applications_data.json'
+        self._applications_log = None  # Открытый на дозапись журнал заявок (открывается при первой заявке)
+        
+        # Видеофайлы статичны - проверяем их один раз при запуске
+        self._greeting_video_ok = self.check_video_file(GREETING_VIDEO_PATH)
+        self._phone_question_video_ok = self.check_video_file(PHONE_QUESTION_VIDEO_PATH)
+        
+        # Уже загруженные видео (путь -> документ Telegram), чтобы не загружать их повторно
+        self._video_cache = self.load_video_cache()
         
         # Загружаем сохраненные данные при инициализации
         self.load_users_data()
@@ -83,35 +442,17 @@ class SilentUserBot:
         """
         try:
             # Удаляем все пробелы, скобки, дефисы и другие символы
-            clean_phone = re.sub(r'[^\d+]', '', phone_text)
-            
-            # Проверяем различные форматы российских номеров
-            patterns = [
-                r'^\+7\d{10}$',  # +7XXXXXXXXXX
-                r'^8\d{10}$',    # 8XXXXXXXXXX
-                r'^7\d{10}$',    # 7XXXXXXXXXX
-                r'^\d{10}$',     # XXXXXXXXXX (без кода страны)
-                r'^\d{11}$',     # XXXXXXXXXXX (с кодом страны)
-            ]
-            
-            # Проверяем каждый паттерн
-            for pattern in patterns:
-                if re.match(pattern, clean_phone):
-                    # Нормализуем номер к формату +7XXXXXXXXXX
-                    if clean_phone.startswith('8'):
-                        normalized_phone = '+7' + clean_phone[1:]
-                    elif clean_phone.startswith('7') and len(clean_phone) == 11:
-                        normalized_phone = '+' + clean_phone
-                    elif len(clean_phone) == 10:
-                        normalized_phone = '+7' + clean_phone
-                    elif clean_phone.startswith('+7'):
-                        normalized_phone = clean_phone
-                    else:
-                        normalized_phone = '+7' + clean_phone[-10:]
-                    
-                    # Проверяем, что номер действительно российский
-                    if normalized_phone.startswith('+7') and len(normalized_phone) == 12:
-                        return True, normalized_phone, ""
+            clean_phone = PHONE_CLEAN_RE.sub('', phone_text)
+            
+            # Нормализуем номер к формату +7XXXXXXXXXX по длине и первому символу
+            first_char = clean_phone[:1]
+            normalizer = PHONE_NORMALIZERS.get((len(clean_phone), first_char if first_char in ('+', '7', '8') else ''))
+            if normalizer:
+                normalized_phone = normalizer(clean_phone)
+                
+                # Проверяем, что номер действительно российский
+                if NORMALIZED_PHONE_RE.fullmatch(normalized_phone):
+                    return True, normalized_phone, ""
             
             return False, "", "Неверный формат номера телефона. Используйте формат: +7XXXXXXXXXX или 8XXXXXXXXXX"
             
@@ -130,21 +471,16 @@ class SilentUserBot:
             tuple: (found, phone_number, error_message)
         """
         try:
-            # Паттерны для поиска номера телефона в тексте
-            patterns = [
-                r'(\+7|8|7)?[\s\-\(]?(\d{3})[\s\-\)]?(\d{3})[\s\-]?(\d{2})[\s\-]?(\d{2})',  # Основной паттерн
-                r'(\+7|8|7)?[\s\-\(]?(\d{4})[\s\-\)]?(\d{2})[\s\-]?(\d{2})[\s\-]?(\d{2})',  # Альтернативный формат
-                r'(\d{3})[\s\-]?(\d{3})[\s\-]?(\d{2})[\s\-]?(\d{2})',  # Простой формат
-            ]
-            
-            for pattern in patterns:
-                matches = re.finditer(pattern, text)
-                for match in matches:
-                    phone_part = match.group(0)
-                    # Валидируем найденный номер
-                    is_valid, clean_phone, error_msg = self.validate_phone_number(phone_part)
-                    if is_valid:
-                        return True, clean_phone, ""
+            for match in PHONE_FIND_RE.finditer(text):
+                country_code, number = match.groups()
+                digits = PHONE_CLEAN_RE.sub('', number)
+                # Валидируем найденный номер (код страны + цифры без разделителей)
+                is_valid, clean_phone, error_msg = self.validate_phone_number((country_code or '') + digits)
+                if not is_valid and country_code:
+                    # Цифра, принятая за код страны, могла быть частью номера - проверяем номер без нее
+                    is_valid, clean_phone, error_msg = self.validate_phone_number(digits)
+                if is_valid:
+                    return True, clean_phone, ""
             
             return False, "", "Номер телефона не найден в сообщении"
             
@@ -152,10 +488,11 @@ class SilentUserBot:
             logger.error(f"Ошибка при извлечении номера телефона: {e}")
             return False, "", "Ошибка при поиске номера телефона"
     
-    def signal_handler(self, signum, frame):
-        """Обработчик сигналов для корректного завершения"""
+    def request_shutdown(self):
+        """Запрашивает корректное завершение (вызывается обработчиком SIGINT/SIGTERM в цикле событий)"""
         logger.info("Получен сигнал завершения, очищаем ресурсы...")
-        sys.exit(0)
+        # Отключение клиента завершает run_until_disconnected - очистка ресурсов выполняется в start()
+        self.client.disconnect()
         
     def is_admin_panel_running(self):
         """Проверяет, запущена ли админ панель"""
@@ -180,25 +517,25 @@ class SilentUserBot:
     
     def is_user_blocked(self, user_id):
         """Проверяет, заблокирован ли конкретный пользователь"""
-        logger.info(f"🔍 Проверка блокировки для пользователя {user_id}")
+        logger.debug("🔍 Проверка блокировки для пользователя %s", user_id)
         
         # Проверяем, запущена ли админ панель
         admin_running = self.is_admin_panel_running()
-        logger.info(f"🔍 Админ панель запущена: {admin_running}")
+        logger.debug("🔍 Админ панель запущена: %s", admin_running)
         
         if not admin_running:
-            logger.info(f"🔓 Админ панель не запущена, пользователь {user_id} не заблокирован")
+            logger.debug("🔓 Админ панель не запущена, пользователь %s не заблокирован", user_id)
             return False
         
         # Получаем активного администратора
         active_admin_user = self.get_active_admin_user()
-        logger.info(f"🔍 Активный администратор: {active_admin_user}")
+        logger.debug("🔍 Активный администратор: %s", active_admin_user)
         
         if active_admin_user and active_admin_user == user_id:
-            logger.info(f"🔒 Пользователь {user_id} является активным администратором, заблокирован")
+            logger.debug("🔒 Пользователь %s является активным администратором, заблокирован", user_id)
             return True
         
-        logger.info(f"🔓 Пользователь {user_id} не заблокирован")
+        logger.debug("🔓 Пользователь %s не заблокирован", user_id)
         return False
     
     def clear_user_states(self):
@@ -213,6 +550,7 @@ class SilentUserBot:
             self.last_message_times.clear()
             self.survey_reminder_sent.clear()
             self.user_message_counts.clear()
+            self._over_limit_users.clear()
             self.activated_users.clear()
             self.expired_users.clear()
             self.deactivated_users.clear()
@@ -220,7 +558,7 @@ class SilentUserBot:
             logger.info("🧹 Состояния пользователей, напоминания, запланированные напоминания, деактивированные пользователи и данные опросника очищены")
             
             # Сохраняем очищенные данные
-            self.save_users_data()
+            self.mark_users_data_dirty()
         except Exception as e:
             logger.error(f"Ошибка при очистке состояний пользователей: {e}")
     
@@ -230,20 +568,16 @@ class SilentUserBot:
             # Отменяем напоминания для этого пользователя
             self.cancel_reminder(user_id)
             
-            if user_id in self.user_states:
-                del self.user_states[user_id]
+            if self.user_states.pop(user_id, None) is not None:
                 logger.info(f"🧹 Состояние пользователя {user_id} очищено")
-            if user_id in self.user_answers:
-                del self.user_answers[user_id]
+            if self.user_answers.pop(user_id, None) is not None:
                 logger.info(f"🧹 Ответы пользователя {user_id} очищены")
-            if user_id in self.last_message_times:
-                del self.last_message_times[user_id]
+            if self.last_message_times.pop(user_id, None) is not None:
                 logger.info(f"🧹 Время последнего сообщения пользователя {user_id} очищено")
-            if user_id in self.survey_reminder_sent:
-                del self.survey_reminder_sent[user_id]
+            if self.survey_reminder_sent.pop(user_id, None) is not None:
                 logger.info(f"🧹 Данные о напоминании в опроснике пользователя {user_id} очищены")
-            if user_id in self.user_message_counts:
-                del self.user_message_counts[user_id]
+            if self.user_message_counts.pop(user_id, None) is not None:
+                self._over_limit_users.discard(user_id)
                 logger.info(f"🧹 Счетчик сообщений пользователя {user_id} очищен")
             if user_id in self.activated_users:
                 self.activated_users.remove(user_id)
@@ -255,38 +589,126 @@ class SilentUserBot:
                 self.deactivated_users.remove(user_id)
                 logger.info(f"🧹 Статус деактивации пользователя {user_id} сброшен")
             # Сохраняем обновленные данные
-            self.save_users_data()
+            self.mark_users_data_dirty()
         except Exception as e:
             logger.error(f"Ошибка при очистке состояния пользователя {user_id}: {e}")
     
-    async def send_greeting_video(self, chat_id, user_id):
-        """Отправляет приветственное видео"""
+    def check_video_file(self, path: str) -> bool:
+        """
+        Проверяет видеофайл для отправки кружком (наличие, размер, формат)
+        
+        Args:
+            path: Путь к видеофайлу
+            
+        Returns:
+            bool: True если файл можно отправлять
+        """
         try:
-            if not os.path.exists(GREETING_VIDEO_PATH):
-                logger.warning(f"⚠️ Видеофайл {GREETING_VIDEO_PATH} не найден")
+            try:
+                file_size = os.stat(path).st_size
+            except FileNotFoundError:
+                logger.warning(f"⚠️ Видеофайл {path} не найден")
                 return False
             
             # Проверяем размер файла
-            file_size = os.path.getsize(GREETING_VIDEO_PATH)
-            logger.info(f"📏 Размер видеофайла: {file_size} байт")
+            logger.info(f"📏 Размер видеофайла {path}: {file_size} байт")
             
             if file_size > 50 * 1024 * 1024:  # 50 МБ
                 logger.warning(f"⚠️ Видеофайл слишком большой: {file_size} байт")
                 return False
             
             # Проверяем расширение файла
-            if not GREETING_VIDEO_PATH.lower().endswith('.mp4'):
-                logger.warning(f"⚠️ Неподдерживаемый формат файла: {GREETING_VIDEO_PATH}")
+            if not path.lower().endswith('.mp4'):
+                logger.warning(f"⚠️ Неподдерживаемый формат файла: {path}")
+                return False
+            
+            return True
+        except Exception as e:
+            logger.error(f"❌ Ошибка при проверке видеофайла {path}: {e}")
+            return False
+    
+    def load_video_cache(self) -> Dict[str, dict]:
+        """Загружает идентификаторы загруженных видео, если сами файлы не изменились"""
+        try:
+            if not os.path.exists(VIDEO_CACHE_FILE):
+                return {}
+            
+            with open(VIDEO_CACHE_FILE, 'rb') as f:
+                entries = load_json(f.read())
+            
+            video_cache = {}
+            for path, entry in entries.items():
+                if not os.path.exists(path):
+                    continue
+                stat = os.stat(path)
+                if entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns:
+                    video_cache[path] = entry
+            
+            logger.info(f"📂 Загружено {len(video_cache)} сохраненных видео из {VIDEO_CACHE_FILE}")
+            return video_cache
+        except Exception as e:
+            logger.error(f"Ошибка при загрузке кэша видео: {e}")
+            return {}
+    
+    async def remember_video(self, path: str, message):
+        """Запоминает документ отправленного видео для повторного использования"""
+        try:
+            document = getattr(message, 'document', None)
+            if document is None:
+                return
+            
+            # Метаданные файла читаем в потоке ввода-вывода, а словарь кэша меняем только в цикле событий
+            stat = await self.run_io(os.stat, path)
+            self._video_cache[path] = {
+                'id': document.id,
+                'access_hash': document.access_hash,
+                'file_reference': document.file_reference.hex(),
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns
+            }
+            # На диск пишем уже сериализованный снимок кэша
+            await self.run_io(write_file_atomic, VIDEO_CACHE_FILE, dump_json(self._video_cache))
+            logger.info(f"💾 Видео {path} сохранено для повторной отправки без загрузки")
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении кэша видео: {e}")
+    
+    async def send_video_note(self, chat_id, path: str, **kwargs):
+        """
+        Отправляет видео кружком, повторно используя ранее загруженный документ
+        
+        Args:
+            chat_id: ID чата
+            path: Путь к видеофайлу
+            **kwargs: Дополнительные параметры send_file при загрузке файла
+        """
+        entry = self._video_cache.get(path)
+        if entry:
+            try:
+                document = InputDocument(
+                    id=entry['id'],
+                    access_hash=entry['access_hash'],
+                    file_reference=bytes.fromhex(entry['file_reference'])
+                )
+                return await self.client.send_file(entity=chat_id, file=document, video_note=True)
+            except Exception as e:
+                # Ссылка на файл могла устареть - загружаем видео заново
+                logger.warning(f"⚠️ Не удалось отправить сохраненное видео {path}, загружаем заново: {e}")
+                self._video_cache.pop(path, None)
+        
+        message = await self.client.send_file(entity=chat_id, file=path, video_note=True, **kwargs)
+        await self.remember_video(path, message)
+        return message
+    
+    async def send_greeting_video(self, chat_id, user_id):
+        """Отправляет приветственное видео"""
+        try:
+            if not self._greeting_video_ok:
+                logger.warning(f"⚠️ Видеофайл {GREETING_VIDEO_PATH} недоступен")
                 return False
             
             # Отправляем видео как кружок (видеосообщение)
             logger.info(f"📤 Отправка видеофайла как кружок: {GREETING_VIDEO_PATH}")
-            await self.client.send_file(
-                entity=chat_id,
-                file=GREETING_VIDEO_PATH,
-                video_note=True,  # Это делает видео кружком
-                supports_streaming=True
-            )
+            await self.send_video_note(chat_id, GREETING_VIDEO_PATH, supports_streaming=True)
             
             logger.info(f"✅ Приветственное видео-кружок отправлен пользователю {user_id}")
             return True
@@ -297,11 +719,7 @@ class SilentUserBot:
             # Попробуем альтернативный способ
             try:
                 logger.info("🔄 Попытка альтернативной отправки видео как кружок...")
-                await self.client.send_file(
-                    entity=chat_id,
-                    file=GREETING_VIDEO_PATH,
-                    video_note=True
-                )
+                await self.send_video_note(chat_id, GREETING_VIDEO_PATH)
                 logger.info("✅ Видео отправлено альтернативным способом как кружок")
                 return True
             except Exception as e2:
@@ -311,31 +729,13 @@ class SilentUserBot:
     async def send_phone_question_video(self, chat_id, user_id):
         """Отправляет видео с запросом номера телефона"""
         try:
-            if not os.path.exists(PHONE_QUESTION_VIDEO_PATH):
-                logger.warning(f"⚠️ Видеофайл {PHONE_QUESTION_VIDEO_PATH} не найден")
-                return False
-            
-            # Проверяем размер файла
-            file_size = os.path.getsize(PHONE_QUESTION_VIDEO_PATH)
-            logger.info(f"📏 Размер видеофайла запроса телефона: {file_size} байт")
-            
-            if file_size > 50 * 1024 * 1024:  # 50 МБ
-                logger.warning(f"⚠️ Видеофайл запроса телефона слишком большой: {file_size} байт")
-                return False
-            
-            # Проверяем расширение файла
-            if not PHONE_QUESTION_VIDEO_PATH.lower().endswith('.mp4'):
-                logger.warning(f"⚠️ Неподдерживаемый формат файла: {PHONE_QUESTION_VIDEO_PATH}")
+            if not self._phone_question_video_ok:
+                logger.warning(f"⚠️ Видеофайл {PHONE_QUESTION_VIDEO_PATH} недоступен")
                 return False
             
             # Отправляем видео как кружок (видеосообщение)
             logger.info(f"📤 Отправка видеофайла запроса телефона как кружок: {PHONE_QUESTION_VIDEO_PATH}")
-            await self.client.send_file(
-                entity=chat_id,
-                file=PHONE_QUESTION_VIDEO_PATH,
-                video_note=True,  # Это делает видео кружком
-                supports_streaming=True
-            )
+            await self.send_video_note(chat_id, PHONE_QUESTION_VIDEO_PATH, supports_streaming=True)
             
             logger.info(f"✅ Видео-кружок запроса телефона отправлен пользователю {user_id}")
             return True
@@ -346,31 +746,43 @@ class SilentUserBot:
             # Попробуем альтернативный способ
             try:
                 logger.info("🔄 Попытка альтернативной отправки видео запроса телефона как кружок...")
-                await self.client.send_file(
-                    entity=chat_id,
-                    file=PHONE_QUESTION_VIDEO_PATH,
-                    video_note=True
-                )
+                await self.send_video_note(chat_id, PHONE_QUESTION_VIDEO_PATH)
                 logger.info("✅ Видео запроса телефона отправлено альтернативным способом как кружок")
                 return True
             except Exception as e2:
                 logger.error(f"❌ Альтернативная отправка видео запроса телефона тоже не удалась: {e2}")
                 return False
     
+    async def run_io(self, func, *args):
+        """Выполняет дисковую операцию в пуле потоков ввода-вывода"""
+        return await asyncio.get_running_loop().run_in_executor(self._io_pool, func, *args)
+    
+    def request_clear_user_states(self):
+        """Запрашивает очистку состояний (вызывается обработчиком SIGUSR1)"""
+        self._clear_event.set()
+    
     async def check_clear_signals(self):
-        """Проверяет сигналы для очистки состояний"""
+        """Ожидает сигналы для очистки состояний"""
         while True:
             try:
-                clear_file = "clear_user_states.flag"
-                if os.path.exists(clear_file):
+                # Ждем SIGUSR1; файл-флаг проверяем реже для совместимости
+                await asyncio.wait_for(self._clear_event.wait(), timeout=CLEAR_SIGNAL_FILE_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            
+            try:
+                if self._clear_event.is_set():
+                    self._clear_event.clear()
+                    logger.info("🧹 Получен сигнал очистки состояний (SIGUSR1)")
+                    self.clear_user_states()
+                    logger.info("✅ Сигнал очистки обработан")
+                elif await self.run_io(os.path.exists, CLEAR_SIGNAL_FILE):
                     logger.info("🧹 Обнаружен сигнал очистки состояний")
                     self.clear_user_states()
-                    os.remove(clear_file)
+                    await self.run_io(os.remove, CLEAR_SIGNAL_FILE)
                     logger.info("✅ Сигнал очистки обработан")
             except Exception as e:
                 logger.error(f"Ошибка при проверке сигналов очистки: {e}")
-            
-            await asyncio.sleep(5)  # Проверяем каждые 5 секунд
     
     # Методы админ панели
     async def activate_admin_mode(self, event):
@@ -447,19 +859,36 @@ class SilentUserBot:
 """
         await event.respond(help_text)
     
+    async def respond_chunked(self, event, text: str):
+        """
+        Отправляет ответ частями (лимит длины сообщения Telegram) с ограничением частоты отправки
+        
+        Args:
+            event: Событие, на которое отвечаем
+            text: Текст ответа
+        """
+        for chunk in split_message(text):
+            async with self._send_lock:
+                delay = self._next_send_at - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self._next_send_at = time.monotonic() + 1 / TELEGRAM_SENDS_PER_SECOND
+            await event.respond(chunk)
+    
     async def show_admins(self, event):
         """Показать список администраторов"""
         try:
-            admin_list = "👥 Список администраторов:\n"
-            admin_list += "=" * 30 + "\n\n"
+            parts = ["👥 Список администраторов:\n"]
+            append = parts.append
+            append("=" * 30 + "\n\n")
             
             for username in sorted(self.admin_usernames):
-                admin_list += f"• @{username}\n"
+                append(f"• @{username}\n")
             
-            admin_list += f"\n📊 Всего администраторов: {len(self.admin_usernames)}"
-            admin_list += "\n\n💡 Только эти пользователи могут использовать админ панель"
+            append(f"\n📊 Всего администраторов: {len(self.admin_usernames)}")
+            append("\n\n💡 Только эти пользователи могут использовать админ панель")
             
-            await event.respond(admin_list)
+            await self.respond_chunked(event, "".join(parts))
             
         except Exception as e:
             logger.error(f"Ошибка при показе списка администраторов: {e}")
@@ -468,74 +897,69 @@ class SilentUserBot:
     async def show_activation_status(self, event):
         """Показать статус активации пользователей"""
         try:
-            status_text = "🔑 Статус активации пользователей:\n"
-            status_text += "=" * 40 + "\n\n"
+            parts = ["🔑 Статус активации пользователей:\n"]
+            append = parts.append
+            append("=" * 40 + "\n\n")
             
             if not self.user_message_counts:
-                status_text += "📭 Нет активных пользователей\n"
+                append("📭 Нет активных пользователей\n")
             else:
-                # Группируем пользователей по статусу
-                activated_users = []
-                pending_users = []
-                expired_users = []
-                deactivated_users = []
+                # Группируем пользователей по статусу через операции над множествами
+                # (приоритет: деактивирован > активирован > истек > ожидает)
+                counts = self.user_message_counts
+                known_users = counts.keys()
+                deactivated_ids = known_users & self.deactivated_users
+                activated_ids = (known_users & self.activated_users) - deactivated_ids
+                expired_ids = (known_users & self.expired_users) - deactivated_ids - activated_ids
+                pending_ids = known_users - deactivated_ids - activated_ids - expired_ids
                 
-                for user_id, message_count in self.user_message_counts.items():
-                    is_activated = user_id in self.activated_users
-                    is_expired = user_id in self.expired_users
-                    is_deactivated = user_id in self.deactivated_users
-                    
-                    if is_deactivated:
-                        deactivated_users.append((user_id, message_count))
-                    elif is_activated:
-                        activated_users.append((user_id, message_count))
-                    elif is_expired:
-                        expired_users.append((user_id, message_count))
-                    else:
-                        pending_users.append((user_id, message_count))
+                activated_users = [(user_id, counts[user_id]) for user_id in sorted(activated_ids)]
+                pending_users = [(user_id, counts[user_id]) for user_id in sorted(pending_ids)]
+                expired_users = [(user_id, counts[user_id]) for user_id in sorted(expired_ids)]
+                deactivated_users = [(user_id, counts[user_id]) for user_id in sorted(deactivated_ids)]
                 
                 # Показываем активированных пользователей
                 if activated_users:
-                    status_text += "✅ Активированные пользователи:\n"
+                    append("✅ Активированные пользователи:\n")
                     for user_id, count in activated_users:
-                        status_text += f"• ID: {user_id} (сообщений: {count})\n"
-                    status_text += "\n"
+                        append(f"• ID: {user_id} (сообщений: {count})\n")
+                    append("\n")
                 
                 # Показываем ожидающих активации
                 if pending_users:
-                    status_text += "⏳ Ожидающие активации:\n"
+                    append("⏳ Ожидающие активации:\n")
                     for user_id, count in pending_users:
-                        status_text += f"• ID: {user_id} (сообщений: {count}/5)\n"
-                    status_text += "\n"
+                        append(f"• ID: {user_id} (сообщений: {count}/5)\n")
+                    append("\n")
                 
                 # Показываем истекших
                 if expired_users:
-                    status_text += "❌ Истекшие (превысили лимит):\n"
+                    append("❌ Истекшие (превысили лимит):\n")
                     for user_id, count in expired_users:
-                        status_text += f"• ID: {user_id} (сообщений: {count})\n"
-                    status_text += "\n"
+                        append(f"• ID: {user_id} (сообщений: {count})\n")
+                    append("\n")
                 
                 # Показываем деактивированных
                 if deactivated_users:
-                    status_text += "🔇 Деактивированные (заполнили заявку):\n"
+                    append("🔇 Деактивированные (заполнили заявку):\n")
                     for user_id, count in deactivated_users:
-                        status_text += f"• ID: {user_id} (сообщений: {count})\n"
-                    status_text += "\n"
+                        append(f"• ID: {user_id} (сообщений: {count})\n")
+                    append("\n")
                 
                 # Общая статистика
-                status_text += f"📊 Общая статистика:\n"
-                status_text += f"• Всего пользователей: {len(self.user_message_counts)}\n"
-                status_text += f"• Активировано: {len(activated_users)}\n"
-                status_text += f"• Ожидают активации: {len(pending_users)}\n"
-                status_text += f"• Истекли: {len(expired_users)}\n"
-                status_text += f"• Деактивированы: {len(deactivated_users)}\n"
+                append(f"📊 Общая статистика:\n")
+                append(f"• Всего пользователей: {len(self.user_message_counts)}\n")
+                append(f"• Активировано: {len(activated_users)}\n")
+                append(f"• Ожидают активации: {len(pending_users)}\n")
+                append(f"• Истекли: {len(expired_users)}\n")
+                append(f"• Деактивированы: {len(deactivated_users)}\n")
             
             # Информация о ключевых словах
-            status_text += f"\n🔑 Ключевые слова для активации:\n"
-            status_text += f"• Обязательно: 'хочу'\n"
-            status_text += f"• И одно из: 'консультацию' или 'консультация'\n"
+            append(f"\n🔑 Ключевые слова для активации:\n")
+            append(f"• Обязательно: 'хочу'\n")
+            append(f"• И одно из: 'консультацию' или 'консультация'\n")
             
-            await event.respond(status_text)
+            await self.respond_chunked(event, "".join(parts))
             
         except Exception as e:
             logger.error(f"Ошибка при показе статуса активации: {e}")
@@ -548,39 +972,21 @@ class SilentUserBot:
                 await event.respond("📭 Нет данных о заявках")
                 return
             
-            # Сортируем заявки по дате (новые сначала)
-            sorted_applications = sorted(
-                self.applications_data, 
-                key=lambda x: x.get('application_date', ''), 
-                reverse=True
-            )
+            # Заявки хранятся в порядке даты - последние 20 берем с конца (новые сначала)
+            total = len(self.applications_data)
+            lines = ["📋 Данные заявок:", "=" * 40, ""]
+            for i, app in enumerate(reversed(self.applications_data[-20:]), 1):
+                lines.append(f"{i}. ID: {app.user_id} | 📱 {app.phone_number} | 📅 {app.formatted_date}")
             
-            status_text = "📋 Данные заявок:\n"
-            status_text += "=" * 40 + "\n\n"
+            lines.append("")
             
-            for i, app in enumerate(sorted_applications[:20], 1):  # Показываем последние 20
-                user_id = app.get('user_id', 'N/A')
-                phone = app.get('phone_number', 'N/A')
-                date = app.get('application_date', 'N/A')
-                
-                # Форматируем дату
-                try:
-                    if date != 'N/A':
-                        dt = datetime.fromisoformat(date)
-                        formatted_date = dt.strftime("%d.%m.%Y %H:%M")
-                    else:
-                        formatted_date = 'N/A'
-                except:
-                    formatted_date = date
-                
-                status_text += f"{i}. ID: {user_id} | 📱 {phone} | 📅 {formatted_date}\n"
+            if total > 20:
+                lines.append(f"... и еще {total - 20} заявок")
             
-            if len(sorted_applications) > 20:
-                status_text += f"\n... и еще {len(sorted_applications) - 20} заявок"
+            lines.append("")
+            lines.append(f"📊 Всего заявок: {total}")
             
-            status_text += f"\n\n📊 Всего заявок: {len(sorted_applications)}"
-            
-            await event.respond(status_text)
+            await self.respond_chunked(event, "\n".join(lines))
             
         except Exception as e:
             logger.error(f"Ошибка при показе данных заявок: {e}")
@@ -601,9 +1007,11 @@ class SilentUserBot:
                 await event.respond("❌ Интеграция с Bitrix24 не настроена")
                 return
             
-            await event.respond("📊 Загружаю лиды из Bitrix24...")
-            
-            leads = await self.bitrix.get_leads()
+            # Уведомление о загрузке отправляем параллельно с запросом к Bitrix24
+            _, leads = await asyncio.gather(
+                event.respond("📊 Загружаю лиды из Bitrix24..."),
+                self.bitrix.get_leads()
+            )
             
             if not leads:
                 await event.respond("📭 Лиды не найдены")
@@ -612,37 +1020,26 @@ class SilentUserBot:
             # Показываем последние 10 лидов
             recent_leads = leads[:10]
             
-            response = "📋 Последние лиды:\n"
-            response += "=" * 50 + "\n\n"
+            parts = ["📋 Последние лиды:\n"]
+            append = parts.append
+            append("=" * 50 + "\n\n")
             
             for i, lead in enumerate(recent_leads, 1):
-                lead_id = lead.get('ID', 'N/A')
-                title = lead.get('TITLE', 'N/A')
-                name = lead.get('NAME', 'N/A')
-                last_name = lead.get('LAST_NAME', 'N/A')
-                status = lead.get('STATUS_ID', 'N/A')
-                date_create = lead.get('DATE_CREATE', 'N/A')
-                
-                # Форматируем дату
-                try:
-                    if date_create != 'N/A':
-                        dt = datetime.fromisoformat(date_create.replace('Z', '+00:00'))
-                        formatted_date = dt.strftime("%d.%m.%Y %H:%M")
-                    else:
-                        formatted_date = 'N/A'
-                except:
-                    formatted_date = date_create
+                lead_id, title, name, last_name, status, date_create = get_lead_fields(lead, LEAD_FIELDS)
+                formatted_date = format_lead_date(date_create)
                 
-                response += f"{i}. ID: {lead_id} | {name} {last_name}\n"
-                response += f"   📝 {title}\n"
-                response += f"   📊 Статус: {status} | 📅 {formatted_date}\n\n"
+                append(
+                    f"{i}. ID: {lead_id} | {name} {last_name}\n"
+                    f"   📝 {title}\n"
+                    f"   📊 Статус: {status} | 📅 {formatted_date}\n\n"
+                )
             
             if len(leads) > 10:
-                response += f"... и еще {len(leads) - 10} лидов"
+                append(f"... и еще {len(leads) - 10} лидов")
             
-            response += f"\n📊 Всего лидов: {len(leads)}"
+            append(f"\n📊 Всего лидов: {len(leads)}")
             
-            await event.respond(response)
+            await self.respond_chunked(event, "".join(parts))
             
         except Exception as e:
             logger.error(f"Ошибка при показе лидов: {e}")
@@ -655,41 +1052,33 @@ class SilentUserBot:
                 await event.respond("❌ Интеграция с Bitrix24 не настроена")
                 return
             
-            await event.respond("📊 Загружаю новые лиды из Bitrix24...")
-            
-            new_leads = await self.bitrix.get_new_leads()
+            # Уведомление о загрузке отправляем параллельно с запросом к Bitrix24
+            _, new_leads = await asyncio.gather(
+                event.respond("📊 Загружаю новые лиды из Bitrix24..."),
+                self.bitrix.get_new_leads()
+            )
             
             if not new_leads:
                 await event.respond("📭 Новых лидов не найдено")
                 return
             
-            response = "🆕 Новые лиды:\n"
-            response += "=" * 50 + "\n\n"
+            parts = ["🆕 Новые лиды:\n"]
+            append = parts.append
+            append("=" * 50 + "\n\n")
             
             for i, lead in enumerate(new_leads, 1):
-                lead_id = lead.get('ID', 'N/A')
-                title = lead.get('TITLE', 'N/A')
-                name = lead.get('NAME', 'N/A')
-                last_name = lead.get('LAST_NAME', 'N/A')
-                date_create = lead.get('DATE_CREATE', 'N/A')
-                
-                # Форматируем дату
-                try:
-                    if date_create != 'N/A':
-                        dt = datetime.fromisoformat(date_create.replace('Z', '+00:00'))
-                        formatted_date = dt.strftime("%d.%m.%Y %H:%M")
-                    else:
-                        formatted_date = 'N/A'
-                except:
-                    formatted_date = date_create
+                lead_id, title, name, last_name, date_create = get_lead_fields(lead, NEW_LEAD_FIELDS)
+                formatted_date = format_lead_date(date_create)
                 
-                response += f"{i}. ID: {lead_id} | {name} {last_name}\n"
-                response += f"   📝 {title}\n"
-                response += f"   📅 {formatted_date}\n\n"
+                append(
+                    f"{i}. ID: {lead_id} | {name} {last_name}\n"
+                    f"   📝 {title}\n"
+                    f"   📅 {formatted_date}\n\n"
+                )
             
-            response += f"📊 Всего новых лидов: {len(new_leads)}"
+            append(f"📊 Всего новых лидов: {len(new_leads)}")
             
-            await event.respond(response)
+            await self.respond_chunked(event, "".join(parts))
             
         except Exception as e:
             logger.error(f"Ошибка при показе новых лидов: {e}")
@@ -702,29 +1091,29 @@ class SilentUserBot:
                 await event.respond("❌ Интеграция с Bitrix24 не настроена")
                 return
             
-            await event.respond("📊 Загружаю статистику из Bitrix24...")
-            
-            stats = await self.bitrix.get_lead_statistics()
+            # Уведомление о загрузке отправляем параллельно с запросом к Bitrix24
+            _, stats = await asyncio.gather(
+                event.respond("📊 Загружаю статистику из Bitrix24..."),
+                self.bitrix.get_lead_statistics()
+            )
             
             if not stats:
                 await event.respond("❌ Не удалось загрузить статистику")
                 return
             
-            response = "📈 Статистика лидов:\n"
-            response += "=" * 30 + "\n\n"
-            
-            response += f"📊 Всего лидов: {stats.get('total', 0)}\n"
-            response += f"🆕 Новых: {stats.get('new', 0)}\n"
-            response += f"⚙️ В обработке: {stats.get('processed', 0)}\n"
-            response += f"✅ Конвертированных: {stats.get('converted', 0)}\n"
-            response += f"❌ Потерянных: {stats.get('lost', 0)}\n"
-            
-            # Вычисляем процент конверсии
             total = stats.get('total', 0)
             converted = stats.get('converted', 0)
+            response = LEAD_STATISTICS_TEMPLATE.format(
+                total=total,
+                new=stats.get('new', 0),
+                processed=stats.get('processed', 0),
+                converted=converted,
+                lost=stats.get('lost', 0)
+            )
+            
+            # Вычисляем процент конверсии
             if total > 0:
-                conversion_rate = (converted / total) * 100
-                response += f"\n📈 Процент конверсии: {conversion_rate:.1f}%"
+                response += CONVERSION_RATE_TEMPLATE.format((converted / total) * 100)
             
             await event.respond(response)
             
@@ -739,25 +1128,25 @@ class SilentUserBot:
                 await event.respond("❌ Интеграция с Bitrix24 не настроена")
                 return
             
-            await event.respond("📊 Загружаю лиды для экспорта...")
-            
-            leads = await self.bitrix.get_leads()
+            # Уведомление о загрузке отправляем параллельно с запросом к Bitrix24
+            _, leads = await asyncio.gather(
+                event.respond("📊 Загружаю лиды для экспорта..."),
+                self.bitrix.get_leads()
+            )
             
             if not leads:
                 await event.respond("📭 Лиды не найдены")
                 return
             
-            # Сохраняем в файл
+            # Сохраняем в файл (в потоке ввода-вывода, не блокируя цикл событий)
             export_file = 'data/leads_export.json'
-            os.makedirs('data', exist_ok=True)
+            await self.run_io(write_json_file, export_file, leads)
             
-            with open(export_file, 'w', encoding='utf-8') as f:
-                json.dump(leads, f, ensure_ascii=False, indent=2)
-            
-            response = f"📤 Экспорт завершен!\n\n"
-            response += f"📁 Файл: {export_file}\n"
-            response += f"📊 Количество лидов: {len(leads)}\n"
-            response += f"📅 Дата экспорта: {datetime.now().strftime('%d.%m.%Y %H:%M')}"
+            response = EXPORT_DONE_TEMPLATE.format(
+                file=export_file,
+                count=len(leads),
+                date=format_display_datetime(datetime.now())
+            )
             
             await event.respond(response)
             
@@ -774,28 +1163,22 @@ class SilentUserBot:
                 return
             
             user_id = sender.id
-            status_text = "📊 Статус админ панели\n"
-            status_text += "=" * 30 + "\n\n"
-            
-            if self.admin_mode:
-                status_text += "🟢 Админ панель: АКТИВНА\n"
-                if self.active_admin_user:
-                    status_text += f"👤 Активный администратор: {self.active_admin_user}\n"
-                    if self.active_admin_user == user_id:
-                        status_text += "✅ Вы являетесь активным администратором\n"
-                        status_text += "🔒 Основной бот заблокирован для вас\n"
-                    else:
-                        status_text += "❌ Вы не являетесь активным администратором\n"
-                        status_text += "🔓 Основной бот работает для вас\n"
-                else:
-                    status_text += "⚠️ Активный администратор не определен\n"
+            username = sender.username
+            
+            if not self.admin_mode:
+                admin_status = ADMIN_STATUS_INACTIVE
+            elif not self.active_admin_user:
+                admin_status = ADMIN_STATUS_NO_ADMIN
+            elif self.active_admin_user == user_id:
+                admin_status = ADMIN_STATUS_ACTIVE_SELF_TEMPLATE.format(admin=self.active_admin_user)
             else:
-                status_text += "🔴 Админ панель: НЕАКТИВНА\n"
-                status_text += "🔓 Основной бот работает для всех\n"
+                admin_status = ADMIN_STATUS_ACTIVE_OTHER_TEMPLATE.format(admin=self.active_admin_user)
             
-            status_text += f"\n👤 Ваш ID: {user_id}\n"
-            status_text += f"📱 Username: @{username or 'Не указан'}\n"
-            status_text += f"🔑 Администратор: {'Да' if self.is_user_admin(user_id, username) else 'Нет'}\n"
+            status_text = ADMIN_STATUS_HEADER + admin_status + ADMIN_STATUS_USER_TEMPLATE.format(
+                user_id=user_id,
+                username=username or UNKNOWN_USERNAME,
+                is_admin='Да' if self.is_user_admin(user_id, username) else 'Нет'
+            )
             
             await event.respond(status_text)
             
@@ -830,34 +1213,19 @@ class SilentUserBot:
             # Проверяем, является ли пользователь администратором
             if not self.is_user_admin(user_id, username):
                 await event.respond("❌ Доступ запрещен. Вы не являетесь администратором системы.")
-                logger.warning(f"Попытка доступа к админ панели от неавторизованного пользователя: {user_id} (@{username})")
+                logger.warning(f"Попытка доступа к админ панели от неавторизованного пользователя: {user_id} (@{username or UNKNOWN_USERNAME})")
                 return
             
             # Обрабатываем команды
-            if message_text == '/admin':
-                await self.activate_admin_mode(event)
-            elif message_text == '/stop':
-                await self.deactivate_admin_mode(event)
-            elif message_text == '/status':
-                await self.show_status(event)
-            elif message_text == '/clear':
-                await self.force_clear_states(event)
-            elif message_text == '/admins':
-                await self.show_admins(event)
+            handler = self._commands.get(message_text)
+            if handler:
+                await handler(event)
             elif self.admin_mode:
-                # Команды доступные только в режиме админ панели
-                if message_text.startswith('/help'):
-                    await self.show_help(event)
-                elif message_text.startswith('/applications'):
-                    await self.show_applications_data(event)
-                elif message_text.startswith('/leads'):
-                    await self.show_leads(event)
-                elif message_text.startswith('/new'):
-                    await self.show_new_leads(event)
-                elif message_text.startswith('/stats'):
-                    await self.show_lead_statistics(event)
-                elif message_text.startswith('/export'):
-                    await self.export_leads(event)
+                # Команды доступные только в режиме админ панели (по началу сообщения)
+                for command, handler in self._admin_mode_commands.items():
+                    if message_text.startswith(command):
+                        await handler(event)
+                        break
                 else:
                     await event.respond("❌ Неизвестная команда. Используйте /help для списка команд.")
             else:
@@ -880,31 +1248,22 @@ class SilentUserBot:
         admin_list = ', '.join([f"@{username}" for username in self.admin_usernames])
         logger.info(f"👥 Настроенные администраторы: {admin_list}")
         
-        # Регистрация обработчиков событий
-        self.client.add_event_handler(
-            self.handle_new_message, 
-            events.NewMessage(incoming=True)
-        )
+        # Регистрация единого обработчика сообщений (входящие, /test и админ команды)
+        self.client.add_event_handler(self.dispatch_message, events.NewMessage())
         logger.info("✅ Обработчик сообщений зарегистрирован")
         
-        # Добавляем простой обработчик для тестирования
-        self.client.add_event_handler(
-            self.test_handler,
-            events.NewMessage(pattern=r'^/test$')
-        )
-        logger.info("✅ Тестовый обработчик зарегистрирован")
-        
-        # Регистрируем обработчик админ команд
-        self.client.add_event_handler(
-            self.handle_admin_command,
-            events.NewMessage(pattern=r'^/')
-        )
-        logger.info("✅ Обработчик админ команд зарегистрирован")
-        
         # Запускаем фоновую задачу для проверки сигналов очистки
         asyncio.create_task(self.check_clear_signals())
         logger.info("✅ Фоновая задача проверки сигналов запущена")
         
+        # Запускаем фоновую задачу отложенного сохранения данных пользователей
+        asyncio.create_task(self.flush_users_data_loop())
+        logger.info("✅ Фоновая задача сохранения данных пользователей запущена")
+        
+        # Запускаем фоновую задачу удаления старых заявок из журнала
+        asyncio.create_task(self.compact_applications_loop())
+        logger.info("✅ Фоновая задача очистки журнала заявок запущена")
+        
         # Проверяем статус блокировки
         if self.is_admin_panel_running():
             logger.info("⚠️ Админ панель активна, основной бот может быть заблокирован")
@@ -920,59 +1279,78 @@ class SilentUserBot:
         try:
             await self.client.run_until_disconnected()
         finally:
+            # Сохраняем несохраненные изменения данных пользователей через тот же поток
+            # ввода-вывода и под той же блокировкой, что и фоновое сохранение,
+            # чтобы последний снимок не перетерла уже начатая запись
+            await self.flush_users_data()
+            
+            # Дожидаемся завершения начатых операций с файлами
+            self._io_pool.shutdown(wait=True)
+            self.close_applications_log()
+            
             # Закрываем HTTP сессию Bitrix24
             if self.bitrix:
                 await self.bitrix.close()
                 logger.info("🔒 HTTP сессия Bitrix24 закрыта")
     
+    async def dispatch_message(self, event):
+        """Распределяет новое сообщение ровно в один обработчик (один вызов Telethon на событие)"""
+        text = event.raw_text or ''
+        
+        if text == '/test':
+            # Тестовая команда
+            await self.test_handler(event)
+        elif text.startswith('/'):
+            # Команды администратора (в том числе отправленные с этого аккаунта)
+            await self.handle_admin_command(event)
+        elif not event.out:
+            # Входящие сообщения пользователей
+            await self.handle_new_message(event)
+    
     async def handle_new_message(self, event):
         """Обработка новых сообщений"""
         try:
-            logger.info(f"📨 Получено событие: {type(event).__name__}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("📨 Получено событие: %s", type(event).__name__)
+            
+            # Дешевые проверки по ID отправителя выполняем до запроса сущности
+            # отправителя (get_sender может потребовать обращения к Telegram API)
+            user_id = event.sender_id
+            
+            # Проверяем, заблокирован ли этот пользователь
+            is_blocked = self.is_user_blocked(user_id)
+            logger.debug("🔍 Пользователь %s заблокирован: %s", user_id, is_blocked)
+            
+            if is_blocked:
+                logger.info("🔒 Пользователь %s заблокирован админ панелью, игнорируем сообщение", user_id)
+                return
+            
+            # Проверяем, не слишком ли старое сообщение (старше 30 секунд).
+            # Дата сообщения в Telethon - datetime в UTC, сравниваем с системным временем
+            time_diff = time.time() - event.message.date.timestamp()
+            logger.debug("⏰ Время сообщения: %.1f секунд назад", time_diff)
+            if time_diff > 30:
+                logger.info("⏰ Игнорируем старое сообщение от %s (старше 30 секунд)", user_id)
+                return
             
             # Получаем информацию о пользователе
             sender = await event.get_sender()
             if not isinstance(sender, User):
-                logger.info(f"❌ Отправитель не является пользователем: {type(sender).__name__}")
+                logger.info("❌ Отправитель не является пользователем: %s", type(sender).__name__)
                 return
             
-            user_id = sender.id
             username = sender.username
             first_name = sender.first_name
             last_name = sender.last_name
             message_text = event.message.text.strip()
             
-            logger.info(f"👤 Сообщение от пользователя {user_id} ({first_name} {last_name or ''}): {message_text}")
-            
-            # Получаем время отправки сообщения
-            message_date = event.message.date
-            current_time = asyncio.get_event_loop().time()
-            
-            # Проверяем, заблокирован ли этот пользователь
-            is_blocked = self.is_user_blocked(user_id)
-            logger.info(f"🔍 Пользователь {user_id} заблокирован: {is_blocked}")
-            
-            if is_blocked:
-                logger.info(f"🔒 Пользователь {user_id} заблокирован админ панелью, игнорируем сообщение")
-                return
-            
-            # Проверяем, не слишком ли старое сообщение (старше 30 секунд)
-            if hasattr(message_date, 'timestamp'):
-                message_timestamp = message_date.timestamp()
-                time_diff = current_time - message_timestamp
-                logger.info(f"⏰ Время сообщения: {time_diff:.1f} секунд назад")
-                if time_diff > 30:
-                    logger.info(f"⏰ Игнорируем старое сообщение от {user_id} (старше 30 секунд)")
-                    return
+            logger.info("👤 Сообщение от пользователя %s (%s %s): %s", user_id, first_name, last_name or '', message_text)
             
-            logger.info(f"🔓 Обрабатываем сообщение от {user_id}: {message_text}")
+            logger.debug("🔓 Обрабатываем сообщение от %s: %s", user_id, message_text)
             
             # Проверяем, не деактивирован ли пользователь (кроме администраторов)
             if user_id in self.deactivated_users and not self.is_user_admin(user_id, username):
-                logger.info(f"🔇 Пользователь {user_id} деактивирован, игнорируем сообщение (кроме админ команд)")
-                # Позволяем администраторам использовать админ команды даже если они деактивированы
-                if message_text.startswith('/'):
-                    await self.handle_admin_command(event)
+                logger.info("🔇 Пользователь %s деактивирован, игнорируем сообщение (кроме админ команд)", user_id)
                 return
             
             # Обрабатываем сообщение для проверки активации бота
@@ -980,7 +1358,7 @@ class SilentUserBot:
             
             # Если бот не активирован для пользователя, игнорируем сообщение
             if not is_activated:
-                logger.info(f"🔇 Бот не активирован для пользователя {user_id}, игнорируем сообщение")
+                logger.info("🔇 Бот не активирован для пользователя %s, игнорируем сообщение", user_id)
                 return
             
             # Обновляем время последнего сообщения и отменяем напоминания
@@ -992,10 +1370,10 @@ class SilentUserBot:
             
             # Проверяем, является ли это первым сообщением от пользователя
             if user_id not in self.user_states:
-                logger.info(f"🆕 Новый пользователь {user_id}, начинаем беседу")
+                logger.info("🆕 Новый пользователь %s, начинаем беседу", user_id)
                 await self.start_conversation(event, user_id, username, first_name, last_name)
             else:
-                logger.info(f"📝 Продолжаем беседу с пользователем {user_id}")
+                logger.info("📝 Продолжаем беседу с пользователем %s", user_id)
                 await self.process_user_response(event, user_id, message_text)
                 
         except Exception as e:
@@ -1035,15 +1413,15 @@ class SilentUserBot:
                     logger.info(f"🔄 Восстановлен прогресс пользователя {user_id} (вопрос {current_question})")
                     
                     # Отправляем следующий вопрос
-                    if current_question < len(QUESTIONS):
+                    if current_question < QUESTIONS_COUNT:
                         await event.respond(f"🔄 Продолжаем заполнение заявки с вопроса {current_question + 1}")
-                        await asyncio.sleep(1)
+                        await asyncio.sleep(MESSAGE_PAUSE)
                         await event.respond(QUESTIONS[current_question])
                     else:
                         # Если все вопросы заполнены, запрашиваем контакт
                         self.user_states[user_id]['waiting_for_contact'] = True
                         await event.respond("🔄 Продолжаем заполнение заявки. Осталось указать контактную информацию.")
-                        await asyncio.sleep(1)
+                        await asyncio.sleep(MESSAGE_PAUSE)
                         await event.respond(FINAL_MESSAGE)
                     
                     return
@@ -1063,7 +1441,7 @@ class SilentUserBot:
             video_sent = await self.send_greeting_video(event.chat_id, user_id)
             
             # Небольшая пауза между сообщениями
-            await asyncio.sleep(1)
+            await asyncio.sleep(MESSAGE_PAUSE)
             
             # Отправляем текстовое приветствие
             await event.respond(GREETING_MESSAGE)
@@ -1074,7 +1452,7 @@ class SilentUserBot:
                 logger.warning(f"⚠️ Видео-кружок не был отправлен пользователю {user_id}")
             
             # Отправляем первый вопрос
-            await asyncio.sleep(1)
+            await asyncio.sleep(MESSAGE_PAUSE)
             await event.respond(QUESTIONS[0])
             
             logger.info(f"Начата беседа с пользователем {user_id}")
@@ -1085,13 +1463,12 @@ class SilentUserBot:
     async def process_user_response(self, event, user_id: int, message_text: str):
         """Обработка ответа пользователя"""
         try:
-            if user_id not in self.user_states:
+            state = self.user_states.get(user_id)
+            if state is None:
                 # Если состояние потеряно, начинаем заново
                 await self.start_conversation(event, user_id, None, None, None)
                 return
             
-            state = self.user_states[user_id]
-            
             if state['waiting_for_contact']:
                 await self.process_contact_info(event, user_id, message_text)
             else:
@@ -1107,18 +1484,19 @@ class SilentUserBot:
             current_question = state['current_question']
             
             # Сохраняем ответ
-            self.user_answers[user_id][f"question_{current_question + 1}"] = message_text
+            self.user_answers[user_id][current_question + 1] = message_text
             
             # Переходим к следующему вопросу
-            state['current_question'] += 1
+            current_question += 1
+            state['current_question'] = current_question
             
             # Сохраняем прогресс
-            self.save_users_data()
+            self.mark_users_data_dirty()
             
-            if state['current_question'] < len(QUESTIONS):
+            if current_question < QUESTIONS_COUNT:
                 # Отправляем следующий вопрос
-                await asyncio.sleep(1)
-                await event.respond(QUESTIONS[state['current_question']])
+                await asyncio.sleep(MESSAGE_PAUSE)
+                await event.respond(QUESTIONS[current_question])
                 
                 # Планируем напоминание в опроснике (только одно на весь опросник)
                 await self.schedule_survey_reminder(user_id, event.chat_id)
@@ -1131,7 +1509,7 @@ class SilentUserBot:
                 video_sent = await self.send_phone_question_video(event.chat_id, user_id)
                 
                 # Небольшая пауза между сообщениями
-                await asyncio.sleep(1)
+                await asyncio.sleep(MESSAGE_PAUSE)
                 
                 # Отправляем текстовый запрос контактной информации
                 await event.respond(FINAL_MESSAGE)
@@ -1175,23 +1553,24 @@ class SilentUserBot:
             consultation_time = self.extract_consultation_time(message_text)
             
             # Сохраняем данные заявки локально (без отправки в CRM)
+            state = self.user_states[user_id]
             user_data = {
                 'user_id': user_id,
-                'username': self.user_states[user_id].get('username'),
-                'first_name': self.user_states[user_id].get('first_name'),
-                'last_name': self.user_states[user_id].get('last_name'),
+                'username': state.get('username'),
+                'first_name': state.get('first_name'),
+                'last_name': state.get('last_name'),
                 'phone_number': phone_number,
                 'consultation_time': consultation_time,
-                'answers': self.user_answers[user_id],
+                'answers': answers_to_payload(self.user_answers[user_id]),
                 'status': 'new',
                 'validation_status': 'validated'
             }
             
             # Сохраняем заявку локально
-            self.save_application(user_data)
+            await self.run_io(self.save_application, user_data)
             
             # Добавляем запись о заявке в файл данных
-            self.add_application_record(user_id, phone_number)
+            await self.add_application_record(user_id, phone_number)
             
             # Отправляем заявку в Bitrix24
             if self.bitrix:
@@ -1207,12 +1586,25 @@ class SilentUserBot:
             else:
                 logger.warning("⚠️ Интеграция с Bitrix24 не настроена, заявка не отправлена")
             
-            # Очищаем прогресс заявки
-            if user_id in self.user_states:
-                del self.user_states[user_id]
-            if user_id in self.user_answers:
-                del self.user_answers[user_id]
-            self.save_users_data()
+            # Отменяем все напоминания для этого пользователя (в том числе запланированные в файлах)
+            self.cancel_reminder(user_id)
+            
+            # Деактивируем пользователя после успешной подачи заявки
+            self.deactivated_users.add(user_id)
+            self.activated_users.discard(user_id)
+            self.expired_users.discard(user_id)
+            self.user_message_counts.pop(user_id, None)
+            self._over_limit_users.discard(user_id)
+            
+            logger.info(f"🔇 Пользователь {user_id} деактивирован после успешной подачи заявки")
+            
+            # Очищаем прогресс заявки и состояние пользователя
+            self.user_states.pop(user_id, None)
+            self.user_answers.pop(user_id, None)
+            self.last_message_times.pop(user_id, None)
+            
+            # Сохраняем все изменения одним сохранением
+            self.mark_users_data_dirty()
             
             # Отправляем подтверждение
             confirmation_message = (
@@ -1223,34 +1615,6 @@ class SilentUserBot:
             )
             await event.respond(confirmation_message)
             
-            # Отменяем все напоминания для этого пользователя
-            self.cancel_reminder(user_id)
-            
-            # Удаляем запланированные напоминания из файлов при успешной подаче заявки
-            if user_id in self.scheduled_reminders:
-                del self.scheduled_reminders[user_id]
-                self.save_users_data()
-                logger.info(f"🗑️ Удалено запланированное напоминание для пользователя {user_id} из файлов (успешная подача заявки)")
-            
-            # Деактивируем пользователя после успешной подачи заявки
-            self.deactivated_users.add(user_id)
-            if user_id in self.activated_users:
-                self.activated_users.remove(user_id)
-            if user_id in self.expired_users:
-                self.expired_users.remove(user_id)
-            if user_id in self.user_message_counts:
-                del self.user_message_counts[user_id]
-            
-            logger.info(f"🔇 Пользователь {user_id} деактивирован после успешной подачи заявки")
-            
-            # Очищаем состояние пользователя
-            if user_id in self.user_states:
-                del self.user_states[user_id]
-            if user_id in self.user_answers:
-                del self.user_answers[user_id]
-            if user_id in self.last_message_times:
-                del self.last_message_times[user_id]
-                
             logger.info(f"✅ Заявка от пользователя {user_id} успешно завершена")
             
         except Exception as e:
@@ -1268,29 +1632,8 @@ class SilentUserBot:
             str: Время консультации или "Не указано"
         """
         try:
-            # Ключевые слова для поиска времени
-            time_keywords = [
-                'утром', 'днем', 'вечером', 'ночью',
-                'завтра', 'сегодня', 'послезавтра',
-                'понедельник', 'вторник', 'среда', 'четверг', 'пятница', 'суббота', 'воскресенье',
-            ]
-            
-            # Ищем ключевые слова в тексте
-            text_lower = text.lower()
-            found_keywords = []
-            
-            for keyword in time_keywords:
-                if keyword in text_lower:
-                    found_keywords.append(keyword)
-            
-            if found_keywords:
-                # Если найдены ключевые слова, возвращаем весь текст как время
-                return text.strip()
-            
-            # Если ключевых слов нет, но есть цифры времени (например, 14:00, 15:30)
-            time_pattern = r'\b\d{1,2}:\d{2}\b'
-            time_match = re.search(time_pattern, text)
-            if time_match:
+            if TIME_KEYWORDS_RE.search(text) or CLOCK_TIME_RE.search(text):
+                # Если найдены ключевые слова или время, возвращаем весь текст как время
                 return text.strip()
             
             return "Не указано"
@@ -1311,8 +1654,9 @@ class SilentUserBot:
         """
         try:
             # Отменяем предыдущее напоминание для этого пользователя, если оно есть
-            if user_id in self.reminder_tasks:
-                self.reminder_tasks[user_id].cancel()
+            previous_task = self.reminder_tasks.get(user_id)
+            if previous_task is not None:
+                previous_task.cancel()
             
             # Сохраняем информацию о запланированном напоминании
             scheduled_time = datetime.now() + timedelta(minutes=delay_minutes)
@@ -1325,16 +1669,33 @@ class SilentUserBot:
             }
             
             # Сохраняем данные
-            self.save_users_data()
+            self.mark_users_data_dirty()
             
             # Создаем новую задачу напоминания
-            task = asyncio.create_task(self.send_reminder(user_id, chat_id, delay_minutes, reminder_type))
-            self.reminder_tasks[user_id] = task
+            self.start_reminder_task(user_id, self.send_reminder(user_id, chat_id, delay_minutes, reminder_type))
             
-            logger.info(f"⏰ Запланировано напоминание для пользователя {user_id} через {delay_minutes} минут (тип: {reminder_type})")
+            logger.info("⏰ Запланировано напоминание для пользователя %s через %s минут (тип: %s)", user_id, delay_minutes, reminder_type)
             
         except Exception as e:
-            logger.error(f"Ошибка при планировании напоминания: {e}")
+            logger.error("Ошибка при планировании напоминания: %s", e)
+    
+    def start_reminder_task(self, key, coro):
+        """
+        Запускает задачу напоминания и хранит ссылку на нее, пока задача не завершится
+        
+        Args:
+            key: Ключ задачи в reminder_tasks (ID пользователя или survey_<ID>)
+            coro: Корутина напоминания
+        """
+        task = asyncio.create_task(coro)
+        self.reminder_tasks[key] = task
+        
+        def forget_task(finished_task):
+            # Ключ мог быть уже занят следующим напоминанием - удаляем только свою задачу
+            if self.reminder_tasks.get(key) is finished_task:
+                del self.reminder_tasks[key]
+        
+        task.add_done_callback(forget_task)
     
     async def schedule_survey_reminder(self, user_id: int, chat_id: int):
         """
@@ -1346,24 +1707,23 @@ class SilentUserBot:
         """
         try:
             # Проверяем, не было ли уже отправлено напоминание для этого пользователя
-            if user_id in self.survey_reminder_sent and self.survey_reminder_sent[user_id]:
-                logger.info(f"⏰ Напоминание в опроснике уже было отправлено пользователю {user_id}")
+            if self.survey_reminder_sent.get(user_id):
+                logger.info("⏰ Напоминание в опроснике уже было отправлено пользователю %s", user_id)
                 return
             
-            # Создаем задачу напоминания через 20 минут
-            task = asyncio.create_task(self.send_survey_reminder(user_id, chat_id))
-            
-            # Сохраняем задачу в reminder_tasks с уникальным ключом
+            # Отменяем предыдущую задачу (ключ в reminder_tasks уникален для опросника)
             reminder_key = f"survey_{user_id}"
-            if reminder_key in self.reminder_tasks:
-                self.reminder_tasks[reminder_key].cancel()
+            previous_task = self.reminder_tasks.get(reminder_key)
+            if previous_task is not None:
+                previous_task.cancel()
             
-            self.reminder_tasks[reminder_key] = task
+            # Создаем задачу напоминания через 20 минут
+            self.start_reminder_task(reminder_key, self.send_survey_reminder(user_id, chat_id))
             
-            logger.info(f"⏰ Запланировано напоминание в опроснике для пользователя {user_id} через 20 минут")
+            logger.info("⏰ Запланировано напоминание в опроснике для пользователя %s через 20 минут", user_id)
             
         except Exception as e:
-            logger.error(f"Ошибка при планировании напоминания в опроснике: {e}")
+            logger.error("Ошибка при планировании напоминания в опроснике: %s", e)
     
     async def send_survey_reminder(self, user_id: int, chat_id: int):
         """
@@ -1379,44 +1739,34 @@ class SilentUserBot:
             
             # Проверяем, что пользователь все еще в опроснике
             if user_id not in self.user_states:
-                logger.info(f"⏰ Пользователь {user_id} больше не в опроснике, отменяем напоминание")
+                logger.info("⏰ Пользователь %s больше не в опроснике, отменяем напоминание", user_id)
                 return
             
             # Проверяем, не отправил ли пользователь сообщение за это время
-            if user_id in self.last_message_times:
-                last_message_time = self.last_message_times[user_id]
-                current_time = datetime.now()
-                time_diff = current_time - last_message_time
-                
-                if time_diff.total_seconds() < 20 * 60:
-                    logger.info(f"⏰ Пользователь {user_id} отправил сообщение после планирования напоминания в опроснике, отменяем")
-                    return
+            last_message_time = self.last_message_times.get(user_id)
+            if last_message_time is not None and time.time() - last_message_time < 20 * 60:
+                logger.info("⏰ Пользователь %s отправил сообщение после планирования напоминания в опроснике, отменяем", user_id)
+                return
             
             # Проверяем, не было ли уже отправлено напоминание
-            if user_id in self.survey_reminder_sent and self.survey_reminder_sent[user_id]:
-                logger.info(f"⏰ Напоминание в опроснике уже было отправлено пользователю {user_id}")
+            if self.survey_reminder_sent.get(user_id):
+                logger.info("⏰ Напоминание в опроснике уже было отправлено пользователю %s", user_id)
                 return
             
             # Отправляем напоминание
-            reminder_text = (
-                "⏰ Напоминание: вы находитесь в процессе заполнения опросника для получения бесплатной консультации.\n\n"
-                "📝 Пожалуйста, ответьте на следующий вопрос, чтобы мы могли лучше понять вашу ситуацию и подготовить для вас индивидуальное решение.\n\n"
-                "💡 Чем подробнее вы ответите, тем точнее мы сможем подобрать оптимальную стратегию списания ваших долгов."
-            )
+            reminder_text = SURVEY_REMINDER_TEXT
             
             await self.client.send_message(chat_id, reminder_text)
-            logger.info(f"📤 Отправлено напоминание в опроснике пользователю {user_id}")
+            logger.info("📤 Отправлено напоминание в опроснике пользователю %s", user_id)
             
             # Отмечаем, что напоминание было отправлено
             self.survey_reminder_sent[user_id] = True
             
             # Удаляем задачу из reminder_tasks
-            reminder_key = f"survey_{user_id}"
-            if reminder_key in self.reminder_tasks:
-                del self.reminder_tasks[reminder_key]
+            self.reminder_tasks.pop(f"survey_{user_id}", None)
             
         except Exception as e:
-            logger.error(f"Ошибка при отправке напоминания в опроснике: {e}")
+            logger.error("Ошибка при отправке напоминания в опроснике: %s", e)
     
     def load_users_data(self):
         """Загружает данные пользователей из файла"""
@@ -1424,8 +1774,8 @@ class SilentUserBot:
             # Пробуем загрузить из основного файла
             if os.path.exists(self.users_data_file):
                 try:
-                    with open(self.users_data_file, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
+                    with open(self.users_data_file, 'rb') as f:
+                        data = load_json(f.read())
                     logger.info(f"📂 Загружены данные из {self.users_data_file}")
                 except PermissionError:
                     logger.warning(f"⚠️ Нет прав на чтение {self.users_data_file}")
@@ -1435,8 +1785,8 @@ class SilentUserBot:
                 fallback_file = 'users_data.json'
                 if os.path.exists(fallback_file):
                     try:
-                        with open(fallback_file, 'r', encoding='utf-8') as f:
-                            data = json.load(f)
+                        with open(fallback_file, 'rb') as f:
+                            data = load_json(f.read())
                         logger.info(f"📂 Загружены данные из резервного файла {fallback_file}")
                     except PermissionError:
                         logger.warning(f"⚠️ Нет прав на чтение резервного файла {fallback_file}")
@@ -1449,11 +1799,11 @@ class SilentUserBot:
             try:
                 # Восстанавливаем счетчики сообщений (только превысивших лимит)
                 expired_counts = data.get('user_message_counts', {})
-                self.user_message_counts = {}
-                for user_id_str, is_expired in expired_counts.items():
-                    if is_expired:
-                        user_id = int(user_id_str)
-                        self.user_message_counts[user_id] = 6  # Устанавливаем значение больше 5
+                self._over_limit_users = {
+                    int(user_id_str) for user_id_str, is_expired in expired_counts.items() if is_expired
+                }
+                # Устанавливаем значение больше 5
+                self.user_message_counts = dict.fromkeys(self._over_limit_users, 6)
                 
                 # Восстанавливаем активированных пользователей
                 self.activated_users = set(int(user_id) for user_id in data.get('activated_users', []))
@@ -1469,17 +1819,25 @@ class SilentUserBot:
                 
                 # Восстанавливаем время последних сообщений
                 last_message_times = data.get('last_message_times', {})
-                self.last_message_times = {}
-                for user_id_str, time_str in last_message_times.items():
-                    try:
-                        user_id = int(user_id_str)
-                        self.last_message_times[user_id] = datetime.fromisoformat(time_str)
-                    except (ValueError, TypeError):
-                        logger.warning(f"Некорректные данные времени для пользователя {user_id_str}")
+                try:
+                    # Время хранится в секундах Unix-времени - преобразуем одним проходом
+                    self.last_message_times = {int(k): float(v) for k, v in last_message_times.items()}
+                except (ValueError, TypeError):
+                    # Файлы прежнего формата (ISO-строки) или поврежденные записи - разбираем по одной
+                    self.last_message_times = {}
+                    fromisoformat = datetime.fromisoformat
+                    for user_id_str, saved_time in last_message_times.items():
+                        try:
+                            user_id = int(user_id_str)
+                            if isinstance(saved_time, str):
+                                saved_time = fromisoformat(saved_time).timestamp()
+                            self.last_message_times[user_id] = float(saved_time)
+                        except (ValueError, TypeError):
+                            logger.warning(f"Некорректные данные времени для пользователя {user_id_str}")
                 
                 # Восстанавливаем прогресс заявок
                 self.user_states = {int(k): v for k, v in data.get('user_states', {}).items()}
-                self.user_answers = {int(k): v for k, v in data.get('user_answers', {}).items()}
+                self.user_answers = {int(k): answers_from_payload(v) for k, v in data.get('user_answers', {}).items()}
                 
                 # Восстанавливаем запланированные напоминания
                 self.scheduled_reminders = {int(k): v for k, v in data.get('scheduled_reminders', {}).items()}
@@ -1493,55 +1851,110 @@ class SilentUserBot:
             logger.error(f"Ошибка при загрузке данных пользователей: {e}")
             # Не прерываем работу бота из-за ошибок загрузки
     
-    def save_users_data(self):
-        """Сохраняет данные пользователей в файл"""
+    def serialize_users_data(self) -> tuple[bytes, int]:
+        """
+        Сериализует данные пользователей для сохранения
+        
+        Returns:
+            tuple: (JSON для записи в файл, количество пользователей, превысивших лимит)
+        """
+        # Подготавливаем данные для сохранения
+        # Сохраняем только пользователей, которые превысили лимит в 5 сообщений
+        expired_message_counts = dict.fromkeys(self._over_limit_users, True)
+        
+        data = {
+            'user_message_counts': expired_message_counts,
+            'activated_users': list(self.activated_users),
+            'expired_users': list(self.expired_users),
+            'deactivated_users': list(self.deactivated_users),
+            'survey_reminder_sent': self.survey_reminder_sent,
+            # Ключи-числа сериализуются в строки при записи
+            'last_message_times': self.last_message_times,
+            'user_states': self.user_states,
+            'user_answers': {
+                user_id: answers_to_payload(answers)
+                for user_id, answers in self.user_answers.items()
+            },
+            'scheduled_reminders': self.scheduled_reminders
+        }
+        return dump_json(data), len(expired_message_counts)
+    
+    def write_users_data(self, payload: bytes, expired_count: int) -> bool:
+        """Записывает сериализованные данные пользователей в файл, возвращает True при успехе"""
         try:
-            # Подготавливаем данные для сохранения
-            # Сохраняем только пользователей, которые превысили лимит в 5 сообщений
-            expired_message_counts = {}
-            for user_id, count in self.user_message_counts.items():
-                if count > 5:
-                    expired_message_counts[str(user_id)] = True
-            
-            data = {
-                'user_message_counts': expired_message_counts,
-                'activated_users': list(self.activated_users),
-                'expired_users': list(self.expired_users),
-                'deactivated_users': list(self.deactivated_users),
-                'survey_reminder_sent': self.survey_reminder_sent,
-                'last_message_times': {
-                    str(user_id): time.isoformat() 
-                    for user_id, time in self.last_message_times.items()
-                },
-                'user_states': self.user_states,
-                'user_answers': self.user_answers,
-                'scheduled_reminders': self.scheduled_reminders,
-                'last_save': datetime.now().isoformat()
-            }
-            
             # Пробуем сохранить в основной файл
             try:
                 # Создаем директорию если её нет
                 os.makedirs(os.path.dirname(self.users_data_file), exist_ok=True)
                 
                 # Сохраняем в файл
-                with open(self.users_data_file, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, ensure_ascii=False, indent=2)
+                write_file_atomic(self.users_data_file, payload)
+                self._saved_users_payload = payload
                 
-                logger.info(f"💾 Сохранены данные {len(expired_message_counts)} пользователей (превысивших лимит)")
+                logger.info(f"💾 Сохранены данные {expired_count} пользователей (превысивших лимит)")
                 
             except PermissionError:
                 # Если нет прав на запись в data/, сохраняем в корневой директории
                 fallback_file = 'users_data.json'
                 logger.warning(f"⚠️ Нет прав на запись в {self.users_data_file}, сохраняем в {fallback_file}")
                 
-                with open(fallback_file, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, ensure_ascii=False, indent=2)
+                write_file_atomic(fallback_file, payload)
                 
-                logger.info(f"💾 Сохранены данные {len(expired_message_counts)} пользователей (превысивших лимит) в {fallback_file}")
+                logger.info(f"💾 Сохранены данные {expired_count} пользователей (превысивших лимит) в {fallback_file}")
+            
+            return True
                 
         except Exception as e:
             logger.error(f"Ошибка при сохранении данных пользователей: {e}")
+            return False
+    
+    def mark_users_data_dirty(self):
+        """Отмечает данные пользователей как измененные (сохраняются фоновой задачей)"""
+        self._dirty.set()
+    
+    async def flush_users_data(self):
+        """Сохраняет данные пользователей, если есть несохраненные изменения"""
+        if not self._dirty.is_set():
+            return
+        
+        async with self._save_lock:
+            if not self._dirty.is_set():
+                return
+            self._dirty.clear()
+            
+            try:
+                # Сериализуем в цикле событий (снимок состояния), а пишем в файл в отдельном потоке
+                payload, expired_count = self.serialize_users_data()
+            except Exception as e:
+                logger.error(f"Ошибка при сохранении данных пользователей: {e}")
+                return
+            
+            # Данные не изменились с последней записи - файл не перезаписываем
+            if payload == self._saved_users_payload:
+                return
+            if not await self.run_io(self.write_users_data, payload, expired_count):
+                # Запись не удалась - оставляем данные несохраненными для повторной попытки
+                self._dirty.set()
+    
+    async def flush_users_data_loop(self):
+        """Сохраняет измененные данные пользователей не чаще раза в USERS_DATA_FLUSH_INTERVAL секунд"""
+        while True:
+            # Ждем первого изменения, затем копим изменения в течение интервала
+            await self._dirty.wait()
+            await asyncio.sleep(USERS_DATA_FLUSH_INTERVAL)
+            try:
+                await self.flush_users_data()
+            except Exception as e:
+                logger.error(f"Ошибка при отложенном сохранении данных пользователей: {e}")
+    
+    async def compact_applications_loop(self):
+        """Удаляет старые заявки из журнала раз в APPLICATIONS_COMPACT_INTERVAL секунд (вне пути сохранения заявки)"""
+        while True:
+            try:
+                await self.run_io(self.compact_applications)
+            except Exception as e:
+                logger.error(f"Ошибка при фоновой очистке старых заявок: {e}")
+            await asyncio.sleep(APPLICATIONS_COMPACT_INTERVAL)
     
     def load_applications_data(self):
         """Загружает данные заявок из файла"""
@@ -1549,8 +1962,9 @@ class SilentUserBot:
             # Пробуем загрузить из основного файла
             if os.path.exists(self.applications_data_file):
                 try:
-                    with open(self.applications_data_file, 'r', encoding='utf-8') as f:
-                        self.applications_data = json.load(f)
+                    with open(self.applications_data_file, 'rb') as f:
+                        self.applications_data = [ApplicationRecord.from_dict(record) for record in load_json(f.read())]
+                    self.sort_applications_data()
                     logger.info(f"📂 Загружены данные {len(self.applications_data)} заявок из {self.applications_data_file}")
                 except PermissionError:
                     logger.warning(f"⚠️ Нет прав на чтение {self.applications_data_file}")
@@ -1561,8 +1975,9 @@ class SilentUserBot:
                 fallback_file = 'applications_data.json'
                 if os.path.exists(fallback_file):
                     try:
-                        with open(fallback_file, 'r', encoding='utf-8') as f:
-                            self.applications_data = json.load(f)
+                        with open(fallback_file, 'rb') as f:
+                            self.applications_data = [ApplicationRecord.from_dict(record) for record in load_json(f.read())]
+                        self.sort_applications_data()
                         logger.info(f"📂 Загружены данные {len(self.applications_data)} заявок из резервного файла {fallback_file}")
                     except PermissionError:
                         logger.warning(f"⚠️ Нет прав на чтение резервного файла {fallback_file}")
@@ -1578,8 +1993,12 @@ class SilentUserBot:
             self.applications_data = []
             # Не прерываем работу бота из-за ошибок загрузки
     
-    def save_applications_data(self):
-        """Сохраняет данные заявок в файл"""
+    def sort_applications_data(self):
+        """Упорядочивает заявки по дате (ISO-строки сортируются хронологически)"""
+        self.applications_data.sort(key=application_sort_key)
+    
+    def write_applications_data(self, payload: bytes, count: int):
+        """Записывает сериализованные данные заявок в файл"""
         try:
             # Пробуем сохранить в основной файл
             try:
@@ -1587,37 +2006,33 @@ class SilentUserBot:
                 os.makedirs(os.path.dirname(self.applications_data_file), exist_ok=True)
                 
                 # Сохраняем в файл
-                with open(self.applications_data_file, 'w', encoding='utf-8') as f:
-                    json.dump(self.applications_data, f, ensure_ascii=False, indent=2)
+                write_file_atomic(self.applications_data_file, payload)
                 
-                logger.info(f"💾 Сохранены данные {len(self.applications_data)} заявок")
+                logger.info(f"💾 Сохранены данные {count} заявок")
                 
             except PermissionError:
                 # Если нет прав на запись в data/, сохраняем в корневой директории
                 fallback_file = 'applications_data.json'
                 logger.warning(f"⚠️ Нет прав на запись в {self.applications_data_file}, сохраняем в {fallback_file}")
                 
-                with open(fallback_file, 'w', encoding='utf-8') as f:
-                    json.dump(self.applications_data, f, ensure_ascii=False, indent=2)
+                write_file_atomic(fallback_file, payload)
                 
-                logger.info(f"💾 Сохранены данные {len(self.applications_data)} заявок в {fallback_file}")
+                logger.info(f"💾 Сохранены данные {count} заявок в {fallback_file}")
                 
         except Exception as e:
             logger.error(f"Ошибка при сохранении данных заявок: {e}")
     
-
-    
-    def add_application_record(self, user_id: int, phone_number: str):
+    async def add_application_record(self, user_id: int, phone_number: str):
         """Добавляет запись о заявке"""
         try:
-            application_record = {
-                'user_id': user_id,
-                'phone_number': phone_number,
-                'application_date': datetime.now().isoformat()
-            }
+            application_record = ApplicationRecord(user_id, phone_number, datetime.now().isoformat())
             
+            # Новая заявка всегда самая поздняя - порядок по дате сохраняется
             self.applications_data.append(application_record)
-            self.save_applications_data()
+            
+            # Сериализуем в цикле событий (снимок списка), а пишем в файл в отдельном потоке
+            payload = dump_json(self.applications_data)
+            await self.run_io(self.write_applications_data, payload, len(self.applications_data))
             
             logger.info(f"📝 Добавлена запись о заявке пользователя {user_id}")
             
@@ -1629,20 +2044,11 @@ class SilentUserBot:
         try:
             # Данные уже обновлены в соответствующих методах
             # Просто сохраняем в файл
-            self.save_users_data()
+            self.mark_users_data_dirty()
             
         except Exception as e:
             logger.error(f"Ошибка при обновлении статуса активации пользователя {user_id}: {e}")
     
-    def update_last_message_time(self, user_id: int):
-        """Обновляет время последнего сообщения и сохраняет данные"""
-        try:
-            self.last_message_times[user_id] = datetime.now()
-            self.save_users_data()
-            
-        except Exception as e:
-            logger.error(f"Ошибка при обновлении времени последнего сообщения: {e}")
-    
     def check_activation_keywords(self, text: str) -> bool:
         """
         Проверяет, содержит ли текст ключевые слова для активации бота
@@ -1654,24 +2060,24 @@ class SilentUserBot:
             bool: True если найдены ключевые слова "хочу" И ("консультацию" или "консультация")
         """
         try:
-            text_lower = text.lower().strip()
-            
+            # Регистр учитывается самими шаблонами - копия текста в нижнем регистре не нужна
             # Проверяем наличие обязательного слова "хочу"
-            has_want = 'хочу' in text_lower
+            has_want = ACTIVATION_REQUIRED_RE.search(text) is not None
             
             # Проверяем наличие одного из слов "консультацию" или "консультация"
-            has_consultation = 'консультацию' in text_lower or 'консультация' in text_lower
+            has_consultation = ACTIVATION_CONSULTATION_RE.search(text) is not None
             
             # Активация происходит только при наличии ОБОИХ условий
             if has_want and has_consultation:
                 logger.info(f"🔑 Найдены ключевые слова для активации: 'хочу' и ('консультацию' или 'консультация') в тексте: '{text}'")
                 return True
-            else:
-                if not has_want:
-                    logger.info(f"❌ Не найдено обязательное слово 'хочу' в тексте: '{text}'")
-                if not has_consultation:
-                    logger.info(f"❌ Не найдено слово 'консультацию' или 'консультация' в тексте: '{text}'")
-                return False
+            
+            # Промахи случаются почти на каждом сообщении - пишем их только в отладочный лог
+            if not has_want:
+                logger.debug("❌ Не найдено обязательное слово 'хочу' в тексте: '%s'", text)
+            if not has_consultation:
+                logger.debug("❌ Не найдено слово 'консультацию' или 'консультация' в тексте: '%s'", text)
+            return False
             
         except Exception as e:
             logger.error(f"Ошибка при проверке ключевых слов: {e}")
@@ -1691,46 +2097,48 @@ class SilentUserBot:
         try:
             # Проверяем, не деактивирован ли пользователь
             if user_id in self.deactivated_users:
-                logger.info(f"🔇 Пользователь {user_id} деактивирован, бот не будет активирован")
+                logger.info("🔇 Пользователь %s деактивирован, бот не будет активирован", user_id)
                 return False
             
-            # Инициализируем счетчик для нового пользователя
-            if user_id not in self.user_message_counts:
-                self.user_message_counts[user_id] = 0
+            # Увеличиваем счетчик сообщений (для нового пользователя начинаем с нуля)
+            count = self.user_message_counts.get(user_id, 0) + 1
+            self.user_message_counts[user_id] = count
+            if count == 6:
+                self._over_limit_users.add(user_id)
             
-            # Увеличиваем счетчик сообщений
-            self.user_message_counts[user_id] += 1
+            logger.info("📝 Сообщение %d от пользователя %s: '%s'", count, user_id, message_text)
             
-            logger.info(f"📝 Сообщение {self.user_message_counts[user_id]} от пользователя {user_id}: '{message_text}'")
+            # Бот уже был активирован одним из предыдущих сообщений - ключевые слова не проверяем
+            if user_id in self.activated_users:
+                return True
             
             # Проверяем активацию только в первых 5 сообщениях
-            if self.user_message_counts[user_id] <= 5:
+            if count <= 5:
                 if self.check_activation_keywords(message_text):
                     self.activated_users.add(user_id)
-                    logger.info(f"✅ Бот активирован для пользователя {user_id} после {self.user_message_counts[user_id]} сообщения")
+                    logger.info(f"✅ Бот активирован для пользователя {user_id} после {count} сообщения")
                     # Сохраняем данные при активации
-                    self.save_users_data()
+                    self.mark_users_data_dirty()
                     return True
                 else:
-                    logger.info(f"❌ Ключевые слова не найдены в сообщении {self.user_message_counts[user_id]} от пользователя {user_id}")
+                    logger.debug("❌ Ключевые слова не найдены в сообщении %d от пользователя %s", count, user_id)
             
-            # Если ровно 5 сообщений и бот не активирован, помечаем как истекшего
-            if self.user_message_counts[user_id] == 5 and user_id not in self.activated_users:
+            if count == 5:
+                # Ровно 5 сообщений без активации - помечаем как истекшего
                 self.expired_users.add(user_id)
                 logger.info(f"⏰ Пользователь {user_id} достиг лимита в 5 сообщений без активации, помечен как истекший")
                 # Сохраняем данные при истечении
-                self.save_users_data()
-            
-            # Если уже больше 5 сообщений и бот не активирован, не активируем
-            if self.user_message_counts[user_id] > 5 and user_id not in self.activated_users:
+                self.mark_users_data_dirty()
+            elif count > 5:
+                # Уже больше 5 сообщений без активации - не активируем
                 if user_id not in self.expired_users:
                     self.expired_users.add(user_id)
                     logger.info(f"⏰ Пользователь {user_id} превысил лимит в 5 сообщений, помечен как истекший")
                     # Сохраняем данные при истечении
-                    self.save_users_data()
-                logger.info(f"⏰ Пользователь {user_id} превысил лимит в 5 сообщений, бот не будет активирован")
+                    self.mark_users_data_dirty()
+                logger.info("⏰ Пользователь %s превысил лимит в 5 сообщений, бот не будет активирован", user_id)
             
-            return user_id in self.activated_users
+            return False
             
         except Exception as e:
             logger.error(f"Ошибка при обработке сообщения для активации: {e}")
@@ -1809,115 +2217,77 @@ class SilentUserBot:
             
             # Проверяем, что пользователь все еще в состоянии ожидания телефона
             if user_id not in self.user_states or not self.user_states[user_id].get('waiting_for_contact', False):
-                logger.info(f"⏰ Пользователь {user_id} уже не ожидает ввода телефона, отменяем напоминание")
+                logger.info("⏰ Пользователь %s уже не ожидает ввода телефона, отменяем напоминание", user_id)
                 return
             
             # Проверяем, не отправил ли пользователь сообщение за это время
-            if user_id in self.last_message_times:
-                last_message_time = self.last_message_times[user_id]
-                current_time = datetime.now()
-                time_diff = current_time - last_message_time
-                
-                if time_diff.total_seconds() < delay_minutes * 60:
-                    logger.info(f"⏰ Пользователь {user_id} отправил сообщение после планирования напоминания, отменяем")
-                    return
+            last_message_time = self.last_message_times.get(user_id)
+            if last_message_time is not None and time.time() - last_message_time < delay_minutes * 60:
+                logger.info("⏰ Пользователь %s отправил сообщение после планирования напоминания, отменяем", user_id)
+                return
             
             # Отправляем соответствующее напоминание
-            if reminder_type == 'first':
-                reminder_text = (
-                    "🔍 Вижу, вы ещё не оставили свой номер телефона для бесплатной консультации по списанию долгов.\n\n"
-                    "Не переживайте, если сейчас не самое удобное время — мы подберём для вас оптимальный вариант!\n\n"
-                    "📝 Просто напишите ваш контактный номер, и мы:\n"
-                    " • Согласуем удобное время звонка\n"
-                    " • Ответим на все вопросы\n"
-                    " • Разработаем план действий\n\n"
-                    "📞 Готовы связаться с вами в любой день недели, в том числе в выходные.\n"
-                    "Оставьте свой номер прямо сейчас 👇\n\n"
-                    "P.S. Помните: чем раньше начнём работу над вашей ситуацией, тем быстрее найдём решение!"
-                )
-            elif reminder_type == 'final':
-                reminder_text = (
-                    "😔 К сожалению, мы так и не получили ваш номер телефона…\n"
-                    "Понимаем, что решение финансовых вопросов может вызывать тревогу. Но помните: бездействие только усугубляет ситуацию.\n\n"
-                    "🔔 Есть альтернативный вариант:\n"
-                    "Подписывайтесь на наш канал, где мы ежедневно публикуем:\n"
-                    " • Юридические лайфхаки\n"
-                    " • Истории успешных списаний долгов\n"
-                    " • Пошаговые инструкции по банкротству\n"
-                    " • Ответы на частые вопросы\n\n"
-                    "👉 Присоединяйтесь к нам прямо сейчас:\n"
-                    "@ivan_kiselev_spisanie\n\n"
-                    "Возможно, именно там вы найдёте ответы, которые помогут вам принять правильное решение."
-                )
-            else:
-                logger.error(f"Неизвестный тип напоминания: {reminder_type}")
+            reminder_text = REMINDER_TEXTS.get(reminder_type)
+            if reminder_text is None:
+                logger.error("Неизвестный тип напоминания: %s", reminder_type)
                 return
             
             # Отправляем напоминание
             await self.client.send_message(chat_id, reminder_text)
-            logger.info(f"📤 Отправлено напоминание пользователю {user_id} (тип: {reminder_type})")
+            logger.info("📤 Отправлено напоминание пользователю %s (тип: %s)", user_id, reminder_type)
             
             # Удаляем запланированное напоминание из файлов после срабатывания
-            if user_id in self.scheduled_reminders:
-                del self.scheduled_reminders[user_id]
-                self.save_users_data()
-                logger.info(f"🗑️ Удалено запланированное напоминание для пользователя {user_id} из файлов после срабатывания")
+            if self.scheduled_reminders.pop(user_id, None) is not None:
+                self.mark_users_data_dirty()
+                logger.info("🗑️ Удалено запланированное напоминание для пользователя %s из файлов после срабатывания", user_id)
             
             # Если это первое напоминание, планируем финальное через 23 часа 54 минуты (1439 - 5)
             if reminder_type == 'first':
                 await self.schedule_reminder(user_id, chat_id, 1434, 'final')
-                logger.info(f"⏰ Запланировано финальное напоминание для пользователя {user_id} через 23 часа 54 минуты")
+                logger.info("⏰ Запланировано финальное напоминание для пользователя %s через 23 часа 54 минуты", user_id)
             # Если это финальное напоминание, очищаем состояние пользователя
             elif reminder_type == 'final':
-                if user_id in self.user_states:
-                    del self.user_states[user_id]
-                if user_id in self.user_answers:
-                    del self.user_answers[user_id]
-                if user_id in self.reminder_tasks:
-                    del self.reminder_tasks[user_id]
-                if user_id in self.last_message_times:
-                    del self.last_message_times[user_id]
-                if user_id in self.scheduled_reminders:
-                    del self.scheduled_reminders[user_id]
-                    self.save_users_data()
-                logger.info(f"🧹 Состояние пользователя {user_id} очищено после финального напоминания")
+                self.user_states.pop(user_id, None)
+                self.user_answers.pop(user_id, None)
+                self.reminder_tasks.pop(user_id, None)
+                self.last_message_times.pop(user_id, None)
+                if self.scheduled_reminders.pop(user_id, None) is not None:
+                    self.mark_users_data_dirty()
+                logger.info("🧹 Состояние пользователя %s очищено после финального напоминания", user_id)
             
         except asyncio.CancelledError:
-            logger.info(f"⏰ Напоминание для пользователя {user_id} отменено")
+            logger.info("⏰ Напоминание для пользователя %s отменено", user_id)
         except Exception as e:
-            logger.error(f"Ошибка при отправке напоминания пользователю {user_id}: {e}")
+            logger.error("Ошибка при отправке напоминания пользователю %s: %s", user_id, e)
     
     def update_last_message_time(self, user_id: int):
         """Обновляет время последнего сообщения от пользователя"""
-        self.last_message_times[user_id] = datetime.now()
+        self.last_message_times[user_id] = time.time()
         
         # Удаляем запланированные напоминания при получении сообщения от пользователя
-        if user_id in self.scheduled_reminders:
-            del self.scheduled_reminders[user_id]
-            logger.info(f"🗑️ Удалено запланированное напоминание для пользователя {user_id} из файлов (получено сообщение)")
+        if self.scheduled_reminders.pop(user_id, None) is not None:
+            logger.info("🗑️ Удалено запланированное напоминание для пользователя %s из файлов (получено сообщение)", user_id)
         
         # Сохраняем данные в файл
-        self.save_users_data()
+        self.mark_users_data_dirty()
     
     def cancel_reminder(self, user_id: int):
         """Отменяет напоминание для пользователя"""
-        if user_id in self.reminder_tasks:
-            self.reminder_tasks[user_id].cancel()
-            del self.reminder_tasks[user_id]
-            logger.info(f"⏰ Напоминание для пользователя {user_id} отменено")
+        task = self.reminder_tasks.pop(user_id, None)
+        if task is not None:
+            task.cancel()
+            logger.info("⏰ Напоминание для пользователя %s отменено", user_id)
         
         # Отменяем напоминание в опроснике
-        reminder_key = f"survey_{user_id}"
-        if reminder_key in self.reminder_tasks:
-            self.reminder_tasks[reminder_key].cancel()
-            del self.reminder_tasks[reminder_key]
-            logger.info(f"⏰ Напоминание в опроснике для пользователя {user_id} отменено")
+        task = self.reminder_tasks.pop(f"survey_{user_id}", None)
+        if task is not None:
+            task.cancel()
+            logger.info("⏰ Напоминание в опроснике для пользователя %s отменено", user_id)
         
         # Очищаем запланированное напоминание
-        if user_id in self.scheduled_reminders:
-            del self.scheduled_reminders[user_id]
-            self.save_users_data()
-            logger.info(f"⏰ Запланированное напоминание для пользователя {user_id} очищено")
+        if self.scheduled_reminders.pop(user_id, None) is not None:
+            self.mark_users_data_dirty()
+            logger.info("⏰ Запланированное напоминание для пользователя %s очищено", user_id)
     
     async def restore_scheduled_reminders(self):
         """Восстанавливает запланированные напоминания при перезапуске"""
@@ -1926,9 +2296,10 @@ class SilentUserBot:
                 logger.info("📂 Нет запланированных напоминаний для восстановления")
                 return
             
-            logger.info(f"🔄 Восстанавливаем {len(self.scheduled_reminders)} запланированных напоминаний...")
+            logger.info("🔄 Восстанавливаем %s запланированных напоминаний...", len(self.scheduled_reminders))
             
             current_time = datetime.now()
+            fromisoformat = datetime.fromisoformat
             restored_count = 0
             expired_count = 0
             
@@ -1936,13 +2307,13 @@ class SilentUserBot:
                 try:
                     # Проверяем, что пользователь все еще в состоянии ожидания телефона
                     if user_id not in self.user_states or not self.user_states[user_id].get('waiting_for_contact', False):
-                        logger.info(f"⏰ Пользователь {user_id} больше не ожидает ввода телефона, пропускаем восстановление напоминания")
+                        logger.info("⏰ Пользователь %s больше не ожидает ввода телефона, пропускаем восстановление напоминания", user_id)
                         continue
                     
                     # Проверяем, не истекло ли время напоминания
-                    scheduled_time = datetime.fromisoformat(reminder_data['scheduled_time'])
+                    scheduled_time = fromisoformat(reminder_data['scheduled_time'])
                     if scheduled_time <= current_time:
-                        logger.info(f"⏰ Время напоминания для пользователя {user_id} истекло, пропускаем")
+                        logger.info("⏰ Время напоминания для пользователя %s истекло, пропускаем", user_id)
                         expired_count += 1
                         continue
                     
@@ -1951,7 +2322,7 @@ class SilentUserBot:
                     remaining_minutes = int(time_diff.total_seconds() / 60)
                     
                     if remaining_minutes <= 0:
-                        logger.info(f"⏰ Напоминание для пользователя {user_id} должно было сработать, пропускаем")
+                        logger.info("⏰ Напоминание для пользователя %s должно было сработать, пропускаем", user_id)
                         expired_count += 1
                         continue
                     
@@ -1960,26 +2331,25 @@ class SilentUserBot:
                     reminder_type = reminder_data['reminder_type']
                     
                     # Создаем новую задачу напоминания
-                    task = asyncio.create_task(self.send_reminder(user_id, chat_id, remaining_minutes, reminder_type))
-                    self.reminder_tasks[user_id] = task
+                    self.start_reminder_task(user_id, self.send_reminder(user_id, chat_id, remaining_minutes, reminder_type))
                     
-                    logger.info(f"✅ Восстановлено напоминание для пользователя {user_id} через {remaining_minutes} минут (тип: {reminder_type})")
+                    logger.info("✅ Восстановлено напоминание для пользователя %s через %s минут (тип: %s)", user_id, remaining_minutes, reminder_type)
                     restored_count += 1
                     
                 except Exception as e:
-                    logger.error(f"Ошибка при восстановлении напоминания для пользователя {user_id}: {e}")
+                    logger.error("Ошибка при восстановлении напоминания для пользователя %s: %s", user_id, e)
                     continue
             
-            logger.info(f"🔄 Восстановление завершено: {restored_count} восстановлено, {expired_count} истекло")
+            logger.info("🔄 Восстановление завершено: %s восстановлено, %s истекло", restored_count, expired_count)
             
         except Exception as e:
-            logger.error(f"Ошибка при восстановлении запланированных напоминаний: {e}")
+            logger.error("Ошибка при восстановлении запланированных напоминаний: %s", e)
     
     async def mark_message_as_read(self, event):
         """Отмечает сообщение пользователя как прочитанное ботом"""
         try:
             await event.message.mark_read()
-            logger.info(f"✅ Сообщение отмечено как прочитанное")
+            logger.debug("✅ Сообщение отмечено как прочитанное")
         except Exception as e:
             logger.error(f"❌ Ошибка при отметке сообщения как прочитанного: {e}")
 
@@ -1993,74 +2363,115 @@ class SilentUserBot:
             logger.error(f"Ошибка при отправке уведомления: {e}")
 
     def save_application(self, user_data: Dict):
-        """Сохраняет заявку в локальный файл (только за последние 7 дней)"""
+        """Дописывает заявку в журнал заявок (одна JSON-строка на заявку)"""
         try:
-            # Добавляем timestamp
-            user_data['timestamp'] = datetime.now().isoformat()
+            # Добавляем timestamp (ts_epoch - для сравнения по сроку хранения без разбора даты)
+            now = time.time()
+            user_data['timestamp'] = datetime.fromtimestamp(now).isoformat()
+            user_data['ts_epoch'] = now
             
-            # Читаем существующие заявки
-            applications_file = 'data/applications.json'
-            applications = []
+            line = dump_json(user_data) + b'\n'
             
-            # Пробуем загрузить из основного файла
-            if os.path.exists(applications_file):
-                try:
-                    with open(applications_file, 'r', encoding='utf-8') as f:
-                        applications = json.load(f)
-                except (json.JSONDecodeError, FileNotFoundError):
-                    applications = []
-                except PermissionError:
-                    logger.warning(f"⚠️ Нет прав на чтение {applications_file}")
-                    applications = []
+            # Дописываем заявку в конец журнала - остальные записи не перечитываются
+            applications_log = self._applications_log or self.open_applications_log()
+            applications_log.write(line)
+            applications_log.flush()
             
-            # Фильтруем заявки за последние 7 дней
-            seven_days_ago = datetime.now() - timedelta(days=7)
-            filtered_applications = []
+            logger.info(f"📝 Заявка сохранена в {applications_log.name}")
             
-            for app in applications:
-                try:
-                    app_timestamp = datetime.fromisoformat(app.get('timestamp', ''))
-                    if app_timestamp >= seven_days_ago:
-                        filtered_applications.append(app)
-                except (ValueError, TypeError):
-                    # Если не удалось распарсить дату, оставляем заявку
-                    filtered_applications.append(app)
+        except Exception as e:
+            logger.error(f"❌ Ошибка при сохранении заявки: {e}")
+    
+    def open_applications_log(self):
+        """Открывает журнал заявок для дозаписи (файл остается открытым между заявками)"""
+        # Пробуем открыть основной файл
+        try:
+            # Создаем директорию если её нет
+            os.makedirs(os.path.dirname(APPLICATIONS_LOG_FILE), exist_ok=True)
+            self._applications_log = open(APPLICATIONS_LOG_FILE, 'ab')
+            
+        except PermissionError:
+            # Если нет прав на запись в data/, сохраняем в рабочей директории
+            fallback_file = 'applications.jsonl'
+            logger.warning(f"⚠️ Нет прав на запись в {APPLICATIONS_LOG_FILE}, сохраняем в {fallback_file}")
+            self._applications_log = open(fallback_file, 'ab')
+        
+        return self._applications_log
+    
+    def close_applications_log(self):
+        """Закрывает журнал заявок (при следующей заявке он будет открыт заново)"""
+        if self._applications_log is not None:
+            self._applications_log.close()
+            self._applications_log = None
+    
+    def compact_applications(self):
+        """Оставляет в журнале заявок только заявки за последние 7 дней"""
+        try:
+            # Сжимаем файл, в который сейчас дописываются заявки (основной или резервный)
+            if self._applications_log is not None:
+                applications_file = self._applications_log.name
+            else:
+                applications_file = APPLICATIONS_LOG_FILE
+            if not os.path.exists(applications_file):
+                return
             
-            # Добавляем новую заявку
-            filtered_applications.append(user_data)
+            # Файл будет заменен новым - открытый дескриптор указывал бы на старый файл
+            self.close_applications_log()
             
-            logger.info(f"📊 Сохранено {len(filtered_applications)} заявок за последние 7 дней (было {len(applications)})")
+            cutoff = time.time() - APPLICATIONS_RETENTION_DAYS * 24 * 60 * 60
+            fromisoformat = datetime.fromisoformat
+            kept_lines = []
+            total_count = 0
+            in_window = False
             
-            # Пробуем сохранить в основной файл
-            try:
-                # Создаем директорию если её нет
-                os.makedirs(os.path.dirname(applications_file), exist_ok=True)
-                
-                # Сохраняем обратно в файл
-                with open(applications_file, 'w', encoding='utf-8') as f:
-                    json.dump(filtered_applications, f, ensure_ascii=False, indent=2)
-                
-                logger.info(f"📝 Заявка сохранена в {applications_file}")
-                
-            except PermissionError:
-                # Если нет прав на запись в data/, сохраняем в рабочей директории
-                fallback_file = os.path.join(self.working_dir, 'applications.json')
-                logger.warning(f"⚠️ Нет прав на запись в {applications_file}, сохраняем в {fallback_file}")
-                
-                with open(fallback_file, 'w', encoding='utf-8') as f:
-                    json.dump(filtered_applications, f, ensure_ascii=False, indent=2)
-                
-                logger.info(f"📝 Заявка сохранена в {fallback_file}")
+            # Читаем журнал построчно
+            with open(applications_file, 'rb') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    total_count += 1
+                    # Заявки дописываются по порядку времени - после первой свежей заявки
+                    # все остальные тоже свежие, и разбирать их не нужно
+                    if not in_window:
+                        try:
+                            application = load_json(line)
+                            ts_epoch = application.get('ts_epoch')
+                            if ts_epoch is None:
+                                # Заявки, сохраненные до появления ts_epoch - разбираем ISO-строку
+                                ts_epoch = fromisoformat(application.get('timestamp', '')).timestamp()
+                            if ts_epoch < cutoff:
+                                continue
+                            in_window = True
+                        except (ValueError, TypeError, AttributeError):
+                            # Если не удалось разобрать запись или дату, оставляем заявку
+                            pass
+                    kept_lines.append(line if line.endswith(b'\n') else line + b'\n')
+            
+            write_file_atomic(applications_file, b''.join(kept_lines))
+            logger.info(f"📊 Сохранено {len(kept_lines)} заявок за последние 7 дней (было {total_count})")
             
         except Exception as e:
-            logger.error(f"❌ Ошибка при сохранении заявки: {e}")
+            logger.error(f"❌ Ошибка при очистке старых заявок: {e}")
 
 async def main():
     """Главная функция"""
     bot = SilentUserBot()
+    loop = asyncio.get_running_loop()
+    
+    def set_signal_handler(sig, handler):
+        """Устанавливает обработчик сигнала, выполняемый в цикле событий"""
+        try:
+            loop.add_signal_handler(sig, handler)
+        except NotImplementedError:
+            # Цикл событий не поддерживает add_signal_handler (Windows) - передаем вызов в цикл из обработчика signal
+            signal.signal(sig, lambda *_: loop.call_soon_threadsafe(handler))
+    
     # Устанавливаем обработчик сигналов для корректного завершения
-    signal.signal(signal.SIGINT, bot.signal_handler)
-    signal.signal(signal.SIGTERM, bot.signal_handler)
+    set_signal_handler(signal.SIGINT, bot.request_shutdown)
+    set_signal_handler(signal.SIGTERM, bot.request_shutdown)
+    # SIGUSR1 - очистка состояний пользователей без перезапуска
+    if hasattr(signal, 'SIGUSR1'):
+        set_signal_handler(signal.SIGUSR1, bot.request_clear_user_states)
 
     try:
         await bot.start()
@@ -2069,4 +2480,11 @@ async def main():
         pass
 
 if __name__ == "__main__":
+    # Используем uvloop в качестве цикла событий, если он установлен
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+    
     asyncio.run(main())